@@ -1,43 +1,20 @@
-import networkx as nx 
-import pandas as pd 
-import numpy as np
 from distro import Distribution
-import matplotlib.pyplot  as plt 
+from ingest import load_ratings
+from signed_graph import SignedGraph
+from plotting import finish, plt
+from instrument import from_env
 
 
 
-df = pd.read_csv('bitcoinotc.csv', sep=',')
-
-net = nx.from_pandas_edgelist(  df,
-                                    source='SOURCE',
-                                    target='TARGET',
-                                    edge_attr='RATING',
-                                    create_using=nx.DiGraph)
-
-
-
-pos_ratings_df = df[df['RATING'] > 0]
-pos_net = nx.from_pandas_edgelist(  pos_ratings_df,
-                                        source='SOURCE',
-                                        target='TARGET',
-                                        edge_attr='RATING',
-                                        create_using=nx.DiGraph)
-
-neg_ratings_df = df[df['RATING'] < 0]
-neg_net = nx.from_pandas_edgelist(  neg_ratings_df,
-                                        source='SOURCE',
-                                        target='TARGET',
-                                        edge_attr='RATING',
-                                        create_using=nx.DiGraph)
-
-def plot_pref_attach(net1, net2, net3):
+def plot_pref_attach(net1=None, net2=None, net3=None, path=None, pref=None):
 
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
 
-    k_i1, pi_i1 = Distribution.pref_attach(net1)
-    k_i2, pi_i2 = Distribution.pref_attach(net2)
-    k_i3, pi_i3 = Distribution.pref_attach(net3)
+    # Precomputed (k, pi) of the three networks when given
+    if pref is None:
+        pref = [Distribution.pref_attach(net) for net in (net1, net2, net3)]
+    (k_i1, pi_i1), (k_i2, pi_i2), (k_i3, pi_i3) = pref
 
     plt.scatter(k_i1, pi_i1, s = 10, label = '$G$')
     plt.scatter(k_i2, pi_i2, s = 10, label = '$L_{+}$', color = 'green')
@@ -50,6 +27,25 @@ def plot_pref_attach(net1, net2, net3):
     plt.grid(True)
     plt.legend()
     plt.title('Cumulative Preferential Attachment', fontsize=16)
-    plt.show()
+    finish(path)
+
+def main():
+    from_env()
+
+    # Load data once and split into all, positive and negative ratings
+    df = load_ratings('bitcoinotc.csv')
+
+    graph = SignedGraph.from_frame(df)
+    net = graph.to_networkx()
+    pos_net = graph.positive().to_networkx()
+    neg_net = graph.negative().to_networkx()
+
+    #plot_pref_attach(net, pos_net, neg_net)
+
+    # Attachment measured by replaying the ratings of each network in time order
+    #plot_pref_attach(pref=[Distribution.pref_attach_temporal(d) for d in (df, df[df['RATING'] > 0], df[df['RATING'] < 0])])
+
+
+if __name__ == '__main__':
+    main()
 
-#plot_pref_attach(net, pos_net, neg_net)
@@ -0,0 +1,201 @@
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+import clustering
+from instrument import from_env, traced
+from signed_graph import SignedGraph
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Approximate Clustering
+-------------------------------------------
+Clustering estimates from uniform wedge
+sampling on the undirected graph. A wedge is
+a path u - v - w centred on v, and it is
+closed when u and w are linked. The share of
+closed wedges is
+
+  global     wedges drawn uniformly over all
+             wedges (transitivity)
+  average    a node drawn uniformly, then one
+             of its wedges (average clustering)
+  C(k)       the same within a degree bucket
+
+By Hoeffding, ln(2/delta) / (2 eps^2) wedges
+give an error below eps with probability at
+least 1 - delta. Sampling is split over
+worker processes, each with its own stream
+spawned from one SeedSequence.
+
+    python approx_clustering.py bitcoinotc.csv --eps 0.01 --delta 0.05
+'''
+
+
+# Wedges needed for an error of at most eps with probability 1 - delta
+def sample_size(eps, delta):
+    return math.ceil(math.log(2 / delta) / (2 * eps**2))
+
+
+# Hoeffding half-width of a mean of num_samples values in [0, 1]
+def half_width(num_samples, delta):
+    return math.sqrt(math.log(2 / delta) / (2 * num_samples)) if num_samples else 1.0
+
+
+# Symmetric CSR of the undirected graph without self-loops, from an nx graph
+# or a SignedGraph
+def undirected_adjacency(net):
+    A = net.adjacency() if hasattr(net, 'edge_positions') else clustering.adjacency(net)
+    U = clustering.strip_loops(clustering.symmetrize(A))
+    U.sort_indices()
+    return U
+
+
+# Graph arrays of the current process, set once per worker
+_graph = {}
+
+
+def _set_graph(indptr, indices):
+    n = len(indptr) - 1
+    _graph['indptr'] = indptr
+    _graph['indices'] = indices
+    _graph['keys'] = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr)) * n + indices
+
+
+# Number of closed wedges among count wedges centred on nodes drawn from
+# centers with probabilities p (uniformly when p is None)
+def sample_closed(centers, p, count, seed):
+    indptr, indices, keys = _graph['indptr'], _graph['indices'], _graph['keys']
+    n = len(indptr) - 1
+    rng = np.random.default_rng(seed)
+
+    v = centers[rng.choice(len(centers), size=count, p=p)]
+    start, degree = indptr[v], indptr[v + 1] - indptr[v]
+
+    # Two distinct neighbours of every centre
+    i = (rng.random(count) * degree).astype(np.int64)
+    j = (rng.random(count) * (degree - 1)).astype(np.int64)
+    j += j >= i
+    u, w = indices[start + i], indices[start + j]
+
+    edge = u * n + w
+    found = np.minimum(np.searchsorted(keys, edge), len(keys) - 1)
+    return int((keys[found] == edge).sum())
+
+
+class WedgeSampler:
+
+    def __init__(self, U, workers=1, seed=0):
+        self.indptr = U.indptr.astype(np.int64)
+        self.indices = U.indices.astype(np.int64)
+        self.degree = np.diff(self.indptr)
+        self.workers = workers or os.cpu_count()
+        self.seeds = np.random.SeedSequence(seed)
+        self.pool = None
+
+        _set_graph(self.indptr, self.indices)
+        if self.workers > 1:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_set_graph,
+                                            initargs=(self.indptr, self.indices))
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Closed wedges out of count, the draws split evenly over the workers
+    def closed(self, centers, p, count):
+        parts = [count // self.workers + (i < count % self.workers) for i in range(self.workers)]
+        seeds = self.seeds.spawn(len(parts))
+
+        if self.pool is None:
+            return sum(sample_closed(centers, p, c, s) for c, s in zip(parts, seeds) if c)
+
+        jobs = [self.pool.submit(sample_closed, centers, p, c, s) for c, s in zip(parts, seeds) if c]
+        return sum(job.result() for job in jobs)
+
+    # Estimate and confidence interval of the closed share of count wedges
+    def estimate(self, centers, p, count, delta):
+        if len(centers) == 0:
+            return 0.0, 0.0, 0.0
+        share = self.closed(centers, p, count) / count
+        h = half_width(count, delta)
+        return share, max(share - h, 0.0), min(share + h, 1.0)
+
+    # Transitivity, wedges drawn uniformly over all wedges
+    def transitivity(self, count, delta):
+        centers = np.flatnonzero(self.degree >= 2)
+        wedges = self.degree[centers] * (self.degree[centers] - 1) / 2
+        return self.estimate(centers, wedges / wedges.sum(), count, delta)
+
+    # Average clustering over every node, nodes of degree below 2 count as 0
+    def average(self, count, delta):
+        centers = np.flatnonzero(self.degree >= 2)
+        share = len(centers) / max(len(self.degree), 1)
+        c, lo, hi = self.estimate(centers, None, count, delta)
+        return c * share, lo * share, hi * share
+
+    # Average clustering of the nodes in every degree bucket [k_min, k_max]
+    def by_degree(self, count, delta, base=2):
+        degree = self.degree[self.degree >= 2]
+        edges = np.unique(np.floor(base ** np.arange(1, math.log(max(degree.max(initial=2), 2), base) + 2)))
+
+        rows = []
+        for k_min, k_max in zip(edges[:-1], edges[1:] - 1):
+            centers = np.flatnonzero((self.degree >= k_min) & (self.degree <= k_max))
+            if len(centers) == 0:
+                continue
+            c, lo, hi = self.estimate(centers, None, count, delta)
+            rows.append({'k_min': int(k_min), 'k_max': int(k_max),
+                         'k': self.degree[centers].mean(), 'nodes': len(centers),
+                         'C': c, 'lo': lo, 'hi': hi})
+
+        return pd.DataFrame(rows, columns=['k_min', 'k_max', 'k', 'nodes', 'C', 'lo', 'hi'])
+
+
+# Global, average and per degree bucket clustering of a graph, each within
+# eps of the exact value with probability at least 1 - delta
+@traced
+def approx_clustering(net, eps=0.01, delta=0.05, workers=1, seed=0):
+    count = sample_size(eps, delta)
+
+    with WedgeSampler(undirected_adjacency(net), workers, seed) as sampler:
+        summary = pd.DataFrame([('global', *sampler.transitivity(count, delta)),
+                                ('average', *sampler.average(count, delta))],
+                               columns=['measure', 'C', 'lo', 'hi'])
+        buckets = sampler.by_degree(count, delta)
+
+    return summary, buckets
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='bitcoinotc.csv')
+    parser.add_argument('--eps', type=float, default=0.01)
+    parser.add_argument('--delta', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    summary, buckets = approx_clustering(SignedGraph.load(args.path), args.eps, args.delta,
+                                         args.workers, args.seed)
+    print(f'{sample_size(args.eps, args.delta)} wedges per estimate')
+    print(summary.to_string(index=False))
+    print(buckets.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
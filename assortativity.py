@@ -0,0 +1,165 @@
+import argparse
+
+import pandas as pd
+import numpy as np
+from instrument import from_env, traced
+from signed_graph import SignedGraph
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Assortativity
+-------------------------------------------
+Degree and rating assortativity of G, L+
+and L-. The edge arrays of the rating graph
+are taken once and every network is a mask
+over them, so each coefficient is a Pearson
+correlation reduced over edge arrays with
+numpy. Degree pairs are (x of the source, y
+of the target) for x, y in {in, out}, as in
+nx.degree_assortativity_coefficient. Rating
+assortativity correlates the mean rating
+received by the two ends of every edge.
+
+    python assortativity.py bitcoinotc.csv
+'''
+
+PAIRS = [('in', 'in'), ('in', 'out'), ('out', 'in'), ('out', 'out')]
+
+
+# Pearson correlation of two arrays, NaN when either is constant
+def pearson(x, y):
+    x = x - x.mean()
+    y = y - y.mean()
+    norm = np.sqrt((x * x).sum() * (y * y).sum())
+    return float((x * y).sum() / norm) if norm > 0 else np.nan
+
+
+class EdgeArrays:
+
+    # Dense source and target of every edge of the full graph, the
+    # networks are masks over these
+    def __init__(self, graph):
+        self.graph = graph
+        self.n = len(graph.nodes)
+        self.source = graph.sources()
+        self.target = graph.indices.astype(np.int64)
+        self.rating = graph.rating.astype(np.int64)
+
+        self.masks = {'G': graph.mask, 'L+': graph.positive().mask, 'L-': graph.negative().mask}
+
+    # Source, target and rating of the edges of one network
+    def edges(self, name):
+        mask = self.masks[name]
+        if mask is None:
+            return self.source, self.target, self.rating
+        return self.source[mask], self.target[mask], self.rating[mask]
+
+    # In and out degree of every dense id in one network
+    def degrees(self, name):
+        source, target, _ = self.edges(name)
+        return {'in': np.bincount(target, minlength=self.n),
+                'out': np.bincount(source, minlength=self.n)}
+
+
+# r for every degree pair and for mean received rating in one network
+def network_assortativity(edges, name):
+    source, target, rating = edges.edges(name)
+    degree = edges.degrees(name)
+
+    row = {f'{x}-{y}': pearson(degree[x][source].astype(np.float64), degree[y][target].astype(np.float64))
+           for x, y in PAIRS}
+
+    # Mean rating received, edges touching a never rated node are left out
+    received = np.bincount(target, weights=rating, minlength=edges.n)
+    mean_rating = np.divide(received, degree['in'], out=np.full(edges.n, np.nan), where=degree['in'] > 0)
+    x, y = mean_rating[source], mean_rating[target]
+    rated = ~(np.isnan(x) | np.isnan(y))
+    row['rating'] = pearson(x[rated], y[rated])
+
+    return row
+
+
+# Assortativity table with one row per network
+@traced
+def assortativity(graph):
+    edges = EdgeArrays(graph)
+    rows = {name: network_assortativity(edges, name) for name in edges.masks}
+    return pd.DataFrame.from_dict(rows, orient='index').rename_axis('network').reset_index()
+
+
+# k_nn(k): mean y-degree of the targets of nodes with x-degree k
+def knn(source, target, degree, x='out', y='in'):
+    n = len(degree[x])
+    neighbor_sum = np.bincount(source, weights=degree[y][target], minlength=n)
+    k = degree[x]
+    has = k > 0
+
+    means = pd.Series(neighbor_sum[has] / k[has]).groupby(k[has]).mean()
+    return means.index.to_numpy(), means.to_numpy()
+
+
+# k_nn(k) curves of G, L+ and L-, name -> (k, knn)
+@traced
+def knn_curves(graph, x='out', y='in'):
+    edges = EdgeArrays(graph)
+    curves = {}
+    for name in edges.masks:
+        source, target, _ = edges.edges(name)
+        curves[name] = knn(source, target, edges.degrees(name), x, y)
+    return curves
+
+
+# Degree assortativity of the growing rating graph, at num_points times
+# spread evenly over the edges. A pair joins the graph at its first rating
+@traced
+def assortativity_over_time(df, num_points=200, x='out', y='in'):
+    df = df.sort_values('TIME', kind='stable')
+    time = df['TIME'].to_numpy()
+
+    nodes, inverse = np.unique(np.concatenate([df['SOURCE'].to_numpy(), df['TARGET'].to_numpy()]),
+                               return_inverse=True)
+    n, m = len(nodes), len(df)
+    source, target = inverse[:m], inverse[m:]
+
+    _, first = np.unique(source * n + target, return_index=True)
+    first.sort()
+    source, target, time = source[first], target[first], time[first]
+
+    ends = np.unique(np.linspace(1, len(source), min(num_points, len(source))).astype(np.int64))
+    degree = {'in': np.zeros(n), 'out': np.zeros(n)}
+    r = np.empty(len(ends))
+
+    start = 0
+    for i, end in enumerate(ends):
+        degree['in'] += np.bincount(target[start:end], minlength=n)
+        degree['out'] += np.bincount(source[start:end], minlength=n)
+        start = end
+
+        # Sums over edges of a source or target value are sums over nodes
+        # weighted by their out or in degree, only the cross term needs the edges
+        dx, dy = degree[x], degree[y]
+        sx, sxx = degree['out'] @ dx, degree['out'] @ (dx * dx)
+        sy, syy = degree['in'] @ dy, degree['in'] @ (dy * dy)
+        sxy = dx[source[:end]] @ dy[target[:end]]
+
+        var = (sxx - sx * sx / end) * (syy - sy * sy / end)
+        r[i] = (sxy - sx * sy / end) / np.sqrt(var) if var > 0 else np.nan
+
+    return pd.Series(time[ends - 1]), pd.Series(r)
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='bitcoinotc.csv')
+    args = parser.parse_args()
+
+    print(assortativity(SignedGraph.load(args.path)).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
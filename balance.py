@@ -0,0 +1,134 @@
+import argparse
+import time
+
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+import clustering
+from instrument import from_env, traced
+from signed_graph import SignedGraph
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Structural Balance
+-------------------------------------------
+Signed triad census of the rating graph.
+Every pair of users that rated each other
+is one undirected signed edge, positive when
+the ratings between them sum to more than
+zero and negative when they sum to less
+(pairs that cancel out are dropped). The
+triangles +++ and +-- are balanced, ++- and
+--- are not. Counts come from the vectorized
+triangle enumeration in clustering.py, with
+positive edges weighted 1 and negative edges
+2 so the weight of a triangle is 2^(number
+of negative edges).
+
+    python balance.py bitcoinotc.csv
+'''
+
+TRIADS = ['+++', '++-', '+--', '---']
+BALANCED = np.array([True, False, True, False])
+
+# Edge weights, the product over a triangle identifies its triad
+POSITIVE_WEIGHT = 1
+NEGATIVE_WEIGHT = 2
+
+
+# Symmetric CSR over the dense ids of the graph, 1 for positive pairs and
+# 2 for negative pairs, from the latest rating in each direction
+def signed_adjacency(graph):
+    n = len(graph.nodes)
+    pos = graph.edge_positions()
+    source, target = graph.sources()[pos], graph.indices[pos]
+    rating = graph.rating[pos].astype(np.int64)
+
+    # Ratings of a -> b and b -> a summed, self ratings left out
+    loops = source == target
+    R = sp.coo_matrix((rating[~loops], (source[~loops], target[~loops])), shape=(n, n)).tocsr()
+    R = (R + R.T).tocsr()
+
+    sign = np.sign(R.data)
+    R.data = np.where(sign > 0, POSITIVE_WEIGHT, NEGATIVE_WEIGHT).astype(np.float64)
+    R.data[sign == 0] = 0
+    R.eliminate_zeros()
+    return R
+
+
+# Triad counts over the whole graph (4,) and per node (n, 4), in TRIADS order
+@traced
+def triad_counts(W, max_wedges=clustering.MAX_WEDGES):
+    n = W.shape[0]
+    totals = np.zeros(len(TRIADS), dtype=np.int64)
+    per_node = np.zeros(n * len(TRIADS), dtype=np.int64)
+
+    for a, b, c, w in clustering.triangles(W, max_wedges):
+        kind = np.rint(np.log2(w)).astype(np.int64)
+        totals += np.bincount(kind, minlength=len(TRIADS))
+        for node in (a, b, c):
+            per_node += np.bincount(node * len(TRIADS) + kind, minlength=len(per_node))
+
+    return totals, per_node.reshape(n, len(TRIADS))
+
+
+# Count and share of every triad, against the share expected if the edge
+# signs were shuffled over the same triangles
+def census_frame(totals, positive_share):
+    p, q = positive_share, 1 - positive_share
+    expected = np.array([p**3, 3 * p**2 * q, 3 * p * q**2, q**3])
+
+    census = pd.DataFrame({'triad': TRIADS, 'count': totals, 'balanced': BALANCED})
+    census['share'] = census['count'] / max(totals.sum(), 1)
+    census['expected_share'] = expected
+    return census
+
+
+# Triads through every node that is in at least one triangle
+def node_frame(nodes, per_node):
+    triads = per_node.sum(axis=1)
+    present = triads > 0
+
+    df = pd.DataFrame(per_node[present], columns=TRIADS)
+    df.insert(0, 'node', nodes[present])
+    df['triads'] = triads[present]
+    df['balanced'] = per_node[present][:, BALANCED].sum(axis=1)
+    df['balance_ratio'] = df['balanced'] / df['triads']
+    return df
+
+
+# Triad census and per-node balance of a SignedGraph
+@traced
+def structural_balance(graph, max_wedges=clustering.MAX_WEDGES):
+    W = signed_adjacency(graph)
+    totals, per_node = triad_counts(W, max_wedges)
+
+    positive_share = np.mean(W.data == POSITIVE_WEIGHT) if W.nnz else 0.0
+    return census_frame(totals, positive_share), node_frame(graph.nodes, per_node)
+
+
+# Share of all triangles that are balanced
+def balance_ratio(census):
+    return census.loc[census['balanced'], 'count'].sum() / max(census['count'].sum(), 1)
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='bitcoinotc.csv')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    census, nodes = structural_balance(SignedGraph.load(args.path))
+
+    print(census.to_string(index=False))
+    print(f'balanced share {balance_ratio(census):.4f}, {len(nodes)} nodes in triangles, '
+          f'{time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import numpy as np
+from distro import Distribution
+from ingest import build_graph
+from signed_graph import SignedGraph
+from synthetic import make_loaded_ratings
+from user_index import UserIndex
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Benchmarks
+-------------------------------------------
+Wall time, peak RSS and throughput of the
+Distribution methods on synthetic rating
+data of growing size. Every measurement runs
+in a fresh process so peak memory is not
+shared between methods. Results are written
+to a JSON baseline, and later runs are
+compared against it.
+
+    python bench.py --sizes 10000 100000 1000000 --save bench_baseline.json
+    python bench.py --compare bench_baseline.json
+    python bench.py --legacy
+    python bench.py --imports
+'''
+
+# Sizes above which methods that need an nx.DiGraph are skipped by default
+NX_MAX_EDGES = 10**6
+
+
+# Input of every benchmarked method, built before the timer starts
+def setup(method, df):
+    if method == 'distributions':
+        return (SignedGraph.from_frame(df).degree_frame('in'),)
+    if method in ('cc_by_degree', 'pref_attach'):
+        return (build_graph(df),)
+    if method == 'k_vs_t':
+        return (df, Distribution.top_k_users(df, 100))
+    return (df,)
+
+
+# Degree over time of 100 users, including the cost of building the index
+def k_vs_t_batch(df, users):
+    index = UserIndex(df)
+    return [Distribution.k_vs_t(user, df, index) for user in users]
+
+
+METHODS = {
+    'distributions': Distribution.distributions,
+    'overall_ratings': Distribution.overall_ratings,
+    'cc_by_degree': Distribution.cc_by_degree,
+    'top_5_users_k': Distribution.top_5_users_k,
+    'k_vs_t': k_vs_t_batch,
+    'pref_attach': Distribution.pref_attach,
+}
+NEEDS_NX = {'cc_by_degree', 'pref_attach'}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+# Runs in a child process, sends back the measurements of one method
+def measure(method, num_edges, seed, conn):
+    df = make_loaded_ratings(num_edges, seed=seed)
+    args = setup(method, df)
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    METHODS[method](*args)
+    wall = time.perf_counter() - start
+
+    rss_after = peak_rss_mb()
+    conn.send({'method': method, 'edges': num_edges, 'wall_s': wall,
+               'peak_rss_mb': rss_after, 'method_rss_mb': rss_after - rss_before,
+               'edges_per_s': num_edges / wall if wall > 0 else float('inf')})
+    conn.close()
+
+
+def run_isolated(method, num_edges, seed):
+    parent, child = multiprocessing.Pipe(duplex=False)
+    proc = multiprocessing.Process(target=measure, args=(method, num_edges, seed, child))
+    proc.start()
+    child.close()
+
+    # A child killed by the OOM killer closes the pipe without sending
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {'method': method, 'edges': num_edges, 'wall_s': np.nan, 'peak_rss_mb': np.nan,
+                  'method_rss_mb': np.nan, 'edges_per_s': np.nan}
+    proc.join()
+    result['exitcode'] = proc.exitcode
+    return result
+
+
+def run(methods, sizes, seed=0, nx_max=NX_MAX_EDGES):
+    rows = []
+    for m in sizes:
+        for method in methods:
+            if method in NEEDS_NX and m > nx_max:
+                continue
+            rows.append(run_isolated(method, m, seed))
+            print(pd.DataFrame([rows[-1]]).to_string(index=False, header=len(rows) == 1), flush=True)
+    return rows
+
+
+def save(rows, path):
+    baseline = {'python': platform.python_version(), 'machine': platform.machine(),
+                'numpy': np.__version__, 'pandas': pd.__version__, 'results': rows}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=1)
+
+
+# Ratio of new to baseline wall time and peak RSS for every shared measurement
+def compare(rows, path):
+    with open(path) as f:
+        baseline = pd.DataFrame(json.load(f)['results'])
+
+    merged = pd.DataFrame(rows).merge(baseline, on=['method', 'edges'], suffixes=('', '_base'))
+    merged['wall_ratio'] = merged['wall_s'] / merged['wall_s_base']
+    merged['rss_ratio'] = merged['peak_rss_mb'] / merged['peak_rss_mb_base']
+    return merged[['method', 'edges', 'wall_s', 'wall_s_base', 'wall_ratio', 'peak_rss_mb', 'rss_ratio']]
+
+
+# Import time budget of the compute modules, in seconds, and the backends
+# they must not load at import
+IMPORT_BUDGET_S = 1.5
+CORE_MODULES = ['distro', 'clustering', 'signed_graph', 'ingest', 'user_index', 'instrument',
+                'bitcoin_otc', 'pos_net', 'neg_net', 'all_nets']
+LAZY_BACKENDS = ['networkx', 'matplotlib', 'matplotlib.pyplot']
+
+
+# Import a module in a fresh interpreter, returns its import time and the
+# lazy backends it loaded anyway
+def import_cost(module):
+    code = ('import json, sys, time\n'
+            'start = time.perf_counter()\n'
+            f'import {module}\n'
+            'seconds = time.perf_counter() - start\n'
+            f'print(json.dumps([seconds, [m for m in {LAZY_BACKENDS!r} if m in sys.modules]]))')
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=here).stdout
+    return json.loads(out)
+
+
+# Every core module imports within the budget and without its backends
+def check_imports(budget=IMPORT_BUDGET_S, modules=CORE_MODULES):
+    rows = []
+    for module in modules:
+        seconds, loaded = import_cost(module)
+        rows.append({'module': module, 'import_s': seconds, 'backends': ','.join(loaded),
+                     'ok': seconds <= budget and not loaded})
+    return pd.DataFrame(rows)
+
+
+# Reference implementation of overall_ratings before the single-pass table
+def overall_ratings_legacy(df):
+    df = df.sort_values(by='TARGET')
+    node_vals = df['TARGET'].unique()
+    f = lambda i: np.sum(df[df['TARGET'] == i]['RATING'])
+    tot_ratings = np.array([f(i) for i in node_vals])
+    return pd.DataFrame(zip(node_vals, tot_ratings), columns=['node', 'overall_rating'])
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return time.perf_counter() - start, result
+
+
+# Compare the legacy and single-pass overall ratings
+def bench_overall_ratings(sizes, legacy_max):
+    rows = []
+    for m in sizes:
+        df = make_loaded_ratings(m)
+        t_new, new = timed(Distribution.overall_ratings, df)
+
+        t_old = np.nan
+        if m <= legacy_max:
+            t_old, old = timed(overall_ratings_legacy, df)
+            pd.testing.assert_frame_equal(old, new)
+
+        rows.append({'edges': m, 'legacy_s': t_old, 'single_pass_s': t_new, 'speedup': t_old / t_new})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10**4, 10**5, 10**6, 10**7])
+    parser.add_argument('--methods', nargs='+', default=list(METHODS), choices=list(METHODS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--nx-max', type=int, default=NX_MAX_EDGES,
+                        help='largest size for methods that need an nx.DiGraph')
+    parser.add_argument('--save', help='write the results to this JSON baseline')
+    parser.add_argument('--compare', help='compare the results with this JSON baseline')
+    parser.add_argument('--legacy', action='store_true',
+                        help='time overall_ratings against the old per-target implementation')
+    parser.add_argument('--legacy-max', type=int, default=10**5,
+                        help='largest size the O(edges x nodes) legacy code is run on')
+    parser.add_argument('--imports', action='store_true',
+                        help='check the import time budget of the compute modules')
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_S)
+    args = parser.parse_args()
+
+    if args.imports:
+        table = check_imports(args.import_budget)
+        print(table.to_string(index=False))
+        sys.exit(0 if table['ok'].all() else 1)
+
+    if args.legacy:
+        print(bench_overall_ratings(args.sizes, args.legacy_max).to_string(index=False))
+        return
+
+    rows = run(args.methods, args.sizes, args.seed, args.nx_max)
+    if args.save:
+        save(rows, args.save)
+    if args.compare:
+        print(compare(rows, args.compare).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
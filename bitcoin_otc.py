@@ -1,8 +1,12 @@
-import networkx as nx 
 import pandas as pd 
-import numpy as np
 from distro import Distribution
-import matplotlib.pyplot  as plt 
+from ingest import load_ratings
+from signed_graph import SignedGraph
+from user_index import UserIndex
+from clustering import clustering
+from assortativity import assortativity_over_time
+from plotting import finish, plt
+from instrument import from_env
 
 '''
 James Clooney 
@@ -18,26 +22,20 @@ http://snap.stanford.edu/data/index.html
 '''
 
 def main(): 
+    from_env()
     
-    # Load data into a dataframe
-    df = pd.read_csv('bitcoinotc.csv', sep=',')
-    
-    # Convert time from epoch to readable dates
-    df['TIME'] = pd.to_datetime(df['TIME'],unit='s')
+    # Load data into a dataframe, times already converted to dates
+    df = load_ratings('bitcoinotc.csv')
 
     # Load data into graph 
-    net = nx.from_pandas_edgelist(  df,
-                                    source='SOURCE',
-                                    target='TARGET',
-                                    edge_attr='RATING',
-                                    create_using=nx.DiGraph)
+    graph = SignedGraph.from_frame(df)
 
 
     #############################   ALL RATINGS    ##############################
 
     # In/Out degree dataframes (all ratings)
-    in_degree_df = pd.DataFrame(net.in_degree, columns=['node', 'degree']).sort_values(by='node')
-    out_degree_df = pd.DataFrame(net.out_degree, columns=['node', 'degree']).sort_values(by='node')
+    in_degree_df = graph.degree_frame('in')
+    out_degree_df = graph.degree_frame('out')
 
     # Mean on in/out degree (they should be the same)
     mean_in_degree = in_degree_df['degree'].mean()
@@ -51,21 +49,28 @@ def main():
     #plot_ccdf(in_distro, out_distro)
     #plot_cc(df)    
 
-    #CC_vs_degree(net)
-    #cc_distribution(net)
-    #plot_top10(df)
+    # Per-node rating table shared by the rating views
+    ratings = Distribution.rating_table(df)
+
+    #CC_vs_degree(graph.to_networkx())
+    #cc_distribution(graph.to_networkx())
+    #plot_top10(df, ratings)
+    #plot_lowest10(df, ratings)
 
     #plot_in_k_users(df)
     #plot_out_k_users(df)
     
-    plot_pref_attach(net)
+    # Attachment measured by replaying the ratings in time order
+    plot_pref_attach(pref=Distribution.pref_attach_temporal(df))
+    #plot_assortativity(df)
 
 
-def plot_pref_attach(net):
+def plot_pref_attach(net=None, path=None, pref=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
 
-    k_i, pi_i = Distribution.pref_attach(net)
+    # Precomputed (k, pi) when given, e.g. from the result cache
+    k_i, pi_i = pref if pref is not None else Distribution.pref_attach(net)
     plt.scatter(k_i, pi_i, s = 10)
     plt.xlabel('$k$', fontsize=13)
     plt.ylabel('$\pi(k)$', fontsize=13)
@@ -73,42 +78,50 @@ def plot_pref_attach(net):
     plt.yscale('log')
     plt.grid(True)
     plt.title('Cumulative Preferential Attachment of G', fontsize=16)
-    plt.show()
+    finish(path)
 
 
-def plot_in_k_users(df):
+def plot_in_k_users(df, k=5, index=None, path=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
 
-    top_10 = Distribution.top_5_users_k(df)
+    top_k = Distribution.top_k_users(df, k)
+
+    # One sorted index serves every user's curve
+    if index is None:
+        index = UserIndex(df)
 
-    for i in top_10:
-        t1,t2, y1,y2 = Distribution.k_vs_t(i, df)
+    for i in top_k:
+        t1,t2, y1,y2 = Distribution.k_vs_t(i, df, index)
         plt.plot(t1, y1, label=f'User {i}')
     
     plt.ylabel('Total Degree')
     plt.xscale('log')
-    plt.title('Top 5 Users: Total In-Degree over Time', fontsize=16)
+    plt.title(f'Top {k} Users: Total In-Degree over Time', fontsize=16)
     plt.legend()
-    plt.show()
+    finish(path)
 
-def plot_out_k_users(df):
+def plot_out_k_users(df, k=5, index=None, path=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
 
-    top_10 = Distribution.top_5_users_k(df)
+    top_k = Distribution.top_k_users(df, k)
 
-    for i in top_10:
-        t1,t2, y1,y2 = Distribution.k_vs_t(i, df)
+    # One sorted index serves every user's curve
+    if index is None:
+        index = UserIndex(df)
+
+    for i in top_k:
+        t1,t2, y1,y2 = Distribution.k_vs_t(i, df, index)
         plt.plot(t2, y2, label=f'User {i}', linestyle='dashed')
     
     plt.ylabel('Normalized Network Growth') 
     plt.yscale('log')
-    plt.title('Top 5 User Out-Degree over Time', fontsize=16)
+    plt.title(f'Top {k} User Out-Degree over Time', fontsize=16)
     plt.legend()
-    plt.show()
+    finish(path)
     
-def network_vs_time(df):
+def network_vs_time(df, path=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
 
@@ -118,29 +131,43 @@ def network_vs_time(df):
     plt.ylabel('Normalized Network Growth')
     plt.title('Normalized Edge and Ratings Over Time', fontsize=16)
     plt.legend()
-    plt.show()
+    finish(path)
 
-def cc_distribution(net):
+def plot_assortativity(df=None, path=None, assort=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
+
+    # Precomputed (time, r) when given
+    time, r = assort if assort is not None else assortativity_over_time(df)
+    plt.plot(time, r)
+    plt.ylabel(r'$r$', fontsize=16, rotation=0)
+    plt.grid(True)
+    plt.title('Assortativity over Time', fontsize=16)
+    finish(path)
+
+def cc_distribution(net=None, path=None, cc=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
     plt.title(r'ABC123 vs $\mathrm{ABC123}^{123}$')
 
-    cc = nx.clustering(net)
-    df_cc = pd.DataFrame(cc.items(), columns = ['node', 'cc'])
+    # Precomputed per-node cc values when given
+    if cc is None:
+        cc = clustering(net).values()
+    df_cc = pd.DataFrame({'cc': list(cc)})
     plt.hist(df_cc['cc'], bins=10, color='c', edgecolor='k',  alpha=0.5) 
     plt.xlabel('CC')
     plt.title('Clustering Coefficient (CC) Distribution', fontsize = 16)
-    plt.show()
+    finish(path)
 
 
 
 # Plot top 10 rated users
-def plot_top10(df):
+def plot_top10(df, table=None, path=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
     plt.title(r'ABC123 vs $\mathrm{ABC123}^{123}$')
 
-    data = Distribution.overall_ratings(df)
+    data = Distribution.overall_ratings(df, table)
     data = data.sort_values(by='overall_rating', ascending=False)
 
     data['node'] = data['node'].astype(str)
@@ -149,15 +176,33 @@ def plot_top10(df):
     plt.bar(users['node'], users['overall_rating'], color='springgreen')
     plt.xlabel(r'ID', fontsize=16), plt.ylabel(r'Overall Rating', fontsize=16)
     plt.title(r'Top 10 Rated Users', fontsize=18)
-    plt.show()
+    finish(path)
+
+
+# Plot top 10 lowest rated users
+def plot_lowest10(df, table=None, path=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
+
+    data = Distribution.overall_ratings(df, table)
+    data = data.sort_values(by='overall_rating', ascending=True)
 
+    data['node'] = data['node'].astype(str)
+    users = data[0:9]
 
-def CC_vs_degree(net):
+    plt.bar(users['node'], users['overall_rating'], color='indianred')
+    plt.xlabel(r'ID', fontsize=16), plt.ylabel(r'Overall Rating', fontsize=16)
+    plt.title(r'Top 10 Lowest Rated Users', fontsize=18)
+    finish(path)
+
+
+def CC_vs_degree(net=None, path=None, cc=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
     plt.title(r'ABC123 vs $\mathrm{ABC123}^{123}$')
 
-    x,y = Distribution.cc_by_degree(net)
+    # Precomputed (degrees, average cc) when given
+    x,y = cc if cc is not None else Distribution.cc_by_degree(net)
 
     plt.scatter(x,y,  s = 14)
     plt.xlabel(r'$k$', fontsize=14)
@@ -166,16 +211,15 @@ def CC_vs_degree(net):
     plt.xscale('log')
     plt.grid(True)
     plt.title(r'Average Clustering Coefficient vs Degree for $G$',  fontsize=16)
-    plt.show()
+    finish(path)
 
 
 
  # Plots probability density function (PDF)
-def plot_pdf(in_degree_dist, out_degree_dist):
+def plot_pdf(in_degree_dist, out_degree_dist, path=None):
 
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
-    plt.title(r'ABC123 vs $\mathrm{ABC123}^{123}$')
     # Plotting data 
     fig1 = plt.figure(1, figsize=(8, 6), dpi=100)
 
@@ -189,11 +233,12 @@ def plot_pdf(in_degree_dist, out_degree_dist):
     plt.grid(True)
     plt.legend()
     plt.title(r"G Degree Distribution", fontsize=18)
-    plt.show() 
+    finish(path)
 
  # Plots probability density function (PDF)
-def plot_ccdf(in_degree_dist, out_degree_dist):
-    plt.rcParams['text.usetex'] = True
+def plot_ccdf(in_degree_dist, out_degree_dist, path=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
     # Plotting data 
     fig2 = plt.figure(2, figsize=(8, 6), dpi=100)
     
@@ -214,7 +259,7 @@ def plot_ccdf(in_degree_dist, out_degree_dist):
     plt.grid(True)
     plt.legend()
     plt.title("CCDF Degree Distribution", fontsize=18)
-    plt.show() 
+    finish(path)
 
 
 
@@ -0,0 +1,230 @@
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+import clustering
+from distro import Distribution
+from ingest import load_ratings
+from instrument import from_env, traced
+from plotting import finish, headless, plt
+from signed_graph import SignedGraph
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Dataset Comparison
+-------------------------------------------
+Runs the G, L+ and L- analysis on several
+signed trust networks with the bitcoin-otc
+schema (SOURCE, TARGET, RATING, TIME), e.g.
+bitcoin-alpha or exchange dumps, each in its
+own worker process. The results are merged
+into one comparison table and overlay plots
+of the degree CCDFs, C(k) and preferential
+attachment curves.
+
+    python compare.py bitcoinotc.csv soc-sign-bitcoinalpha.csv.gz --out comparison
+'''
+
+NETWORKS = ['G', 'L+', 'L-']
+
+
+# Dataset name from its file name, bitcoinotc.csv -> bitcoinotc
+def dataset_name(path):
+    name = os.path.basename(path)
+    for ext in ('.gz', '.csv'):
+        name = name[:-len(ext)] if name.endswith(ext) else name
+    return name
+
+
+# Distinct names of several datasets. Names of different files that
+# collide get their parent directories, one at a time, so a/x.csv and
+# b/x.csv become a/x and b/x, and the whole path once there are none
+# left. A file given twice gets its list position
+def dataset_names(paths):
+    files = list(dict.fromkeys(os.path.abspath(path) for path in paths))
+    names = [dataset_name(path) for path in files]
+    parents = [os.path.dirname(path) for path in files]
+
+    while True:
+        counts = Counter(names)
+        clashing = [i for i, name in enumerate(names) if counts[name] > 1]
+        if not clashing:
+            break
+        for i in clashing:
+            parents[i], folder = os.path.split(parents[i])
+            names[i] = f'{folder}/{names[i]}' if folder else files[i]
+
+    named = dict(zip(files, names))
+    given = Counter(os.path.abspath(path) for path in paths)
+    return [named[os.path.abspath(path)] + (f' ({i})' if given[os.path.abspath(path)] > 1 else '')
+            for i, path in enumerate(paths)]
+
+
+# Ratings of one network, L+ and L- keep their sign only
+def network_frame(df, name):
+    if name == 'G':
+        return df
+    return df[df['RATING'] > 0] if name == 'L+' else df[df['RATING'] < 0]
+
+
+# Summary row and curves of one network of a dataset
+def analyse_network(df, graph, name):
+    net = {'G': graph, 'L+': graph.positive(), 'L-': graph.negative()}[name]
+    in_degree, out_degree = net.degree_frame('in'), net.degree_frame('out')
+
+    # Undirected C(k) as Distribution.cc_by_degree, without building an nx graph
+    U = clustering.symmetrize(net.adjacency())
+    present = net.node_mask()
+    cc = clustering.undirected_clustering(U)[present]
+    degree = (np.asarray(U.sum(axis=1)).ravel() + U.diagonal()).astype(np.int64)[present]
+    directed_cc = net.clustering()['CC']
+
+    ratings = network_frame(df, name)
+    row = {'network': name,
+           'ratings': len(ratings),
+           'nodes': net.num_nodes(),
+           'edges': net.num_edges(),
+           'mean_degree': net.num_edges() / max(net.num_nodes(), 1),
+           'max_in_degree': int(in_degree['degree'].max()) if len(in_degree) else 0,
+           'max_out_degree': int(out_degree['degree'].max()) if len(out_degree) else 0,
+           'avg_clustering': float(cc.mean()) if len(cc) else np.nan,
+           'avg_directed_clustering': float(directed_cc.mean()) if len(directed_cc) else np.nan}
+
+    curves = {'in': Distribution.distributions(in_degree),
+              'out': Distribution.distributions(out_degree),
+              'ccdegree': clustering.average_by_degree(cc, degree),
+              'pref': Distribution.pref_attach_temporal(ratings)}
+    return row, curves
+
+
+# End to end analysis of one dataset, run in a worker process
+@traced
+def analyse(path, dataset=None):
+    start = time.perf_counter()
+    df = load_ratings(path)
+    graph = SignedGraph.from_frame(df)
+
+    rows, curves = [], {}
+    for name in NETWORKS:
+        row, curves[name] = analyse_network(df, graph, name)
+        rows.append(row)
+
+    table = pd.DataFrame(rows)
+    table.insert(0, 'dataset', dataset or dataset_name(path))
+    table['positive_share'] = (df['RATING'] > 0).mean()
+    table['first_rating'] = df['TIME'].min()
+    table['last_rating'] = df['TIME'].max()
+    table['seconds'] = time.perf_counter() - start
+    return table, curves
+
+
+# Analyse every dataset in parallel, returns the comparison table and
+# dataset name -> network name -> curves
+def compare(paths, workers=None):
+    workers = workers or min(len(paths), os.cpu_count())
+    names = dataset_names(paths)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(analyse, paths, names))
+
+    table = pd.concat([t for t, _ in results], ignore_index=True)
+    curves = {name: c for name, (_, c) in zip(names, results)}
+    return table, curves
+
+
+# In-degree CCDF of one network for every dataset
+def plot_ccdf(curves, network='G', path=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
+    fig = plt.figure(figsize=(8, 6), dpi=100)
+
+    for dataset, nets in curves.items():
+        dist = nets[network]['in'][:-1]
+        plt.plot(dist.index, dist['ccdf'], marker='o', markersize=3, label=dataset)
+
+    plt.xlabel(r'$k_{in}$', fontsize=16), plt.ylabel(r'$CCDF$', fontsize=16)
+    plt.yscale('log'), plt.xscale('log')
+    plt.grid(True)
+    plt.legend()
+    plt.title(f'In-degree CCDF of {tex_name(network)}', fontsize=18)
+    finish(path)
+
+
+def plot_cc_vs_degree(curves, network='G', path=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
+
+    for dataset, nets in curves.items():
+        x, y = nets[network]['ccdegree']
+        plt.scatter(x, y, s=10, label=dataset)
+
+    plt.xlabel(r'$k$', fontsize=14)
+    plt.ylabel(r'$\left< C(k) \right>$', fontsize=12)
+    plt.yscale('log'), plt.xscale('log')
+    plt.grid(True)
+    plt.legend()
+    plt.title(f'Average Clustering Coefficient vs Degree for {tex_name(network)}', fontsize=16)
+    finish(path)
+
+
+def plot_pref_attach(curves, network='G', path=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
+
+    for dataset, nets in curves.items():
+        k, kappa = nets[network]['pref']
+        plt.scatter(k, kappa, s=10, label=dataset)
+
+    plt.xlabel('$k$', fontsize=13)
+    plt.ylabel(r'$\kappa(k)$', fontsize=13)
+    plt.xscale('log'), plt.yscale('log')
+    plt.grid(True)
+    plt.legend()
+    plt.title(f'Cumulative Preferential Attachment of {tex_name(network)}', fontsize=16)
+    finish(path)
+
+
+def tex_name(network):
+    return {'G': '$G$', 'L+': '$L_{+}$', 'L-': '$L_{-}$'}[network]
+
+
+# Comparison table and overlay plots of every network in out_dir
+def write(table, curves, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    headless()
+    table.to_csv(os.path.join(out_dir, 'comparison.csv'), index=False)
+
+    suffix = {'G': 'g', 'L+': 'l_plus', 'L-': 'l_minus'}
+    for network in NETWORKS:
+        plot_ccdf(curves, network, os.path.join(out_dir, f'ccdf_{suffix[network]}.png'))
+        plot_cc_vs_degree(curves, network, os.path.join(out_dir, f'c(k)_{suffix[network]}.png'))
+        plot_pref_attach(curves, network, os.path.join(out_dir, f'pref_attach_{suffix[network]}.png'))
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+', help='rating files with the bitcoin-otc schema')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='comparison')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table, curves = compare(args.paths, args.workers)
+    write(table, curves, args.out)
+
+    columns = ['dataset', 'network', 'nodes', 'edges', 'mean_degree', 'avg_clustering', 'seconds']
+    print(table[columns].to_string(index=False))
+    print(f'total {time.perf_counter() - start:.2f}s, slowest dataset {table["seconds"].max():.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import time
+
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from distro import Distribution
+from instrument import from_env, traced
+from signed_graph import SignedGraph
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Decomposition
+-------------------------------------------
+Weak and strong components and in, out and
+total k-core numbers of G, L+ and L-, on the
+CSR arrays of a SignedGraph. Components come
+from scipy's csgraph. Cores are peeled in
+batches: at level k every node with degree
+at most k is removed at once and only the
+neighbours it touched are checked again, so
+every edge is visited once per removal.
+Core numbers match nx.core_number (total
+degree of a DiGraph, self-loops left out).
+
+Per-node frames have a 'core' or 'size'
+column and go straight into
+Distribution.distributions(frame, column).
+
+    python decompose.py bitcoinotc.csv
+'''
+
+NETWORKS = {'G': lambda graph: graph, 'L+': SignedGraph.positive, 'L-': SignedGraph.negative}
+
+
+# Binary adjacency of the nodes present in a network, and their dense ids
+def present_adjacency(net):
+    present = np.flatnonzero(net.node_mask())
+    A = net.adjacency()[present][:, present]
+    return sp.csr_matrix(A), present
+
+
+# Component label and component size of every node of a network
+@traced
+def components(net, connection='weak'):
+    A, present = present_adjacency(net)
+    _, labels = connected_components(A, directed=True, connection=connection)
+
+    sizes = np.bincount(labels)
+    return pd.DataFrame({'node': net.nodes[present], 'component': labels, 'size': sizes[labels]})
+
+
+# One row per component with its size, largest first
+def component_sizes(frame):
+    sizes = frame.groupby('component')['size'].first()
+    return sizes.sort_values(ascending=False, kind='stable').reset_index()
+
+
+# Concatenated CSR rows of the given nodes
+def gather(indptr, indices, nodes):
+    lo, hi = indptr[nodes], indptr[nodes + 1]
+    lengths = hi - lo
+    starts = np.cumsum(lengths) - lengths
+    return indices[np.repeat(lo - starts, lengths) + np.arange(lengths.sum())]
+
+
+# Core number of every node by batch peeling. Removing a node lowers the
+# in-degree of the nodes it rates and the out-degree of its raters,
+# direction picks which of the two (or their sum) defines the core
+def core_numbers(A, direction='total'):
+    A = sp.csr_matrix(A, copy=True)
+    A.setdiag(0)
+    A.eliminate_zeros()
+    A.data[:] = 1
+    T = sp.csr_matrix(A.T)
+    n = A.shape[0]
+
+    # Nodes whose degree drops when a node is removed: its out-neighbours
+    # for in-cores, its in-neighbours for out-cores and both for total
+    sides = {'in': [A], 'out': [T], 'total': [A, T]}[direction]
+    in_degree = np.diff(T.indptr)
+    out_degree = np.diff(A.indptr)
+    degree = {'in': in_degree, 'out': out_degree, 'total': in_degree + out_degree}[direction].astype(np.int64)
+
+    core = np.full(n, -1, dtype=np.int64)
+    alive = np.ones(n, dtype=bool)
+    remaining = n
+
+    k = 0
+    candidates = np.arange(n)
+    while remaining:
+        batch = candidates[alive[candidates] & (degree[candidates] <= k)]
+
+        # Nothing left to peel at k, the next level is the smallest degree left
+        if len(batch) == 0:
+            left = np.flatnonzero(alive)
+            k = max(k + 1, int(degree[left].min()))
+            candidates = left
+            continue
+
+        core[batch] = k
+        alive[batch] = False
+        remaining -= len(batch)
+
+        touched = np.concatenate([gather(M.indptr, M.indices, batch) for M in sides])
+        touched = touched[alive[touched]]
+        candidates, lost = np.unique(touched, return_counts=True)
+        degree[candidates] -= lost
+
+    return core
+
+
+# Core number of every node of a network
+@traced
+def cores(net, direction='total'):
+    A, present = present_adjacency(net)
+    return pd.DataFrame({'node': net.nodes[present], 'core': core_numbers(A, direction)})
+
+
+# Giant component shares and core depth of G, L+ and L-
+@traced
+def decompose(graph):
+    rows, dists = [], {}
+    for name, view in NETWORKS.items():
+        net = view(graph)
+        weak, strong = components(net, 'weak'), components(net, 'strong')
+        total, k_in, k_out = cores(net, 'total'), cores(net, 'in'), cores(net, 'out')
+        n = len(weak)
+        top = lambda values: int(values.to_numpy().max(initial=0))
+
+        max_core = top(total['core'])
+        rows.append({'network': name, 'nodes': n,
+                     'wcc': weak['component'].nunique(),
+                     'giant_wcc_share': top(weak['size']) / n if n else np.nan,
+                     'scc': strong['component'].nunique(),
+                     'giant_scc_share': top(strong['size']) / n if n else np.nan,
+                     'max_core': max_core,
+                     'max_core_nodes': int((total['core'] == max_core).sum()),
+                     'max_in_core': top(k_in['core']),
+                     'max_out_core': top(k_out['core'])})
+
+        dists[name] = {'core': Distribution.distributions(total, 'core'),
+                       'wcc_size': Distribution.distributions(component_sizes(weak), 'size'),
+                       'scc_size': Distribution.distributions(component_sizes(strong), 'size')}
+    return pd.DataFrame(rows), dists
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='bitcoinotc.csv')
+    parser.add_argument('--out', help='write the summary table to this csv')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table, _ = decompose(SignedGraph.load(args.path))
+    print(table.to_string(index=False))
+    print(f'{time.perf_counter() - start:.2f}s')
+
+    if args.out:
+        table.to_csv(args.out, index=False)
+
+
+if __name__ == '__main__':
+    main()
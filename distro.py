@@ -1,6 +1,7 @@
 import pandas as pd 
 import numpy as np
-import networkx as nx 
+import clustering
+from instrument import traced
 
 '''
 James Clooney 
@@ -16,9 +17,12 @@ other quantities given a dataframe object.
 
 class Distribution:
 
-    def distributions(df):
+    # Distribution of an integer column, the degree by default, e.g. core
+    # numbers or component sizes
+    @traced
+    def distributions(df, column='degree'):
 
-        degree_count = df.groupby('degree')['degree'].count()
+        degree_count = df.groupby(column)[column].count()
 
         # Number of nodes with k degree 
         degree_dist = pd.DataFrame({'n':degree_count})
@@ -35,50 +39,95 @@ class Distribution:
         return degree_dist
     
 
-    # Return the overall ratings for each node in the network
-    def overall_ratings(df):
+    # Per-node rating table computed in a single pass over the edge list
+    @traced
+    def rating_table(df):
 
-        # Sort by Target
-        df = df.sort_values(by='TARGET')
+        source = df['SOURCE'].to_numpy()
+        target = df['TARGET'].to_numpy()
+        rating = df['RATING'].to_numpy()
 
-        # All node values 
-        node_vals = df['TARGET'].unique()
-        
-        # Finds total rating for a node i 
-        f = lambda i: np.sum(df[df['TARGET'] == i]['RATING'])
+        # Dense ids for every node appearing as a source or a target
+        nodes, inverse = np.unique(np.concatenate([target, source]), return_inverse=True)
+        tgt = inverse[:len(target)]
+        src = inverse[len(target):]
+        n = len(nodes)
 
-        # List of all ratings in order of node number 
-        tot_ratings = np.array([f(i) for i in node_vals])
+        pos = rating > 0
+        neg = rating < 0
+
+        # Sums are accumulated as float64 by bincount, cast back so integer
+        # ratings give the same integer totals as a plain np.sum
+        sum_dtype = np.int64 if np.issubdtype(rating.dtype, np.integer) else np.float64
+        weighted = lambda idx, mask: np.bincount(idx[mask], weights=rating[mask], minlength=n).astype(sum_dtype)
+        counted = lambda idx, mask: np.bincount(idx[mask], minlength=n)
+
+        every = np.ones(len(rating), dtype=bool)
+        table = pd.DataFrame({'node': nodes,
+                              'in_count': counted(tgt, every),
+                              'out_count': counted(src, every),
+                              'pos_in': counted(tgt, pos),
+                              'neg_in': counted(tgt, neg),
+                              'pos_out': counted(src, pos),
+                              'neg_out': counted(src, neg),
+                              'overall_rating': weighted(tgt, every),
+                              'pos_rating': weighted(tgt, pos),
+                              'neg_rating': weighted(tgt, neg)})
+
+        # Mean received rating, NaN for nodes that were never rated
+        table['mean_rating'] = table['overall_rating'] / table['in_count'].where(table['in_count'] > 0)
+
+        return table
+
+
+    # Return the overall ratings for each node in the network
+    @traced
+    def overall_ratings(df, table=None):
+
+        # Reuse a precomputed rating table when one is given
+        if table is None:
+            table = Distribution.rating_table(df)
+
+        # Only nodes that received at least one rating, in order of node number
+        rated = table[table['in_count'] > 0]
+        tot_ratings_df = pd.DataFrame({'node': rated['node'].to_numpy(),
+                                       'overall_rating': rated['overall_rating'].to_numpy()})
 
-        #Store data in dataframe 
-        data = zip(node_vals, tot_ratings)
-        tot_ratings_df =pd.DataFrame(data, columns=['node', 'overall_rating'])
-        
         return tot_ratings_df
 
 
     # Returns the degree values and average cc for the degree 
+    @traced
     def cc_by_degree(graph):
-        # Convert graph to undirected 
-        graph = graph.to_undirected()
 
-        # Calculate clustering coeff. for all nodes 
-        cc = nx.clustering(graph)
-        
-        # Create dataframe with node number, clustering coeffcient, and degree 
-        df_cc = pd.DataFrame(cc.items(), columns = ['node', 'cc'])
-        df_cc['degree'] =  [i[1] for i in graph.degree()]
+        # Undirected version of the graph as a sparse adjacency
+        nodes = list(graph)
+        U = clustering.symmetrize(clustering.adjacency(graph, nodes))
 
-        # Find all unique values of degrees
-        degrees = pd.unique(df_cc['degree'])
+        # Clustering coeff. for all nodes, a self-loop adds two to the degree
+        cc = clustering.undirected_clustering(U)
+        degree = (np.asarray(U.sum(axis=1)).ravel() + U.diagonal()).astype(np.int64)
 
         # Average cc for all unique degrees 
-        f = lambda i: df_cc[df_cc['degree'] == i]
-        y = [np.mean(f(i)['cc']) for i in degrees]
+        degrees, y = clustering.average_by_degree(cc, degree)
+
+        return degrees, y 
+
+
+    # Sampled C(k) over log2 degree buckets, within eps of the exact bucket
+    # averages with probability 1 - delta. Far faster than cc_by_degree on big graphs
+    @traced
+    def cc_by_degree_approx(graph, eps=0.01, delta=0.05, workers=1, seed=0):
+
+        # Imported here, it pulls in the process pool and SignedGraph
+        import approx_clustering
 
-        return degrees,y 
+        _, buckets = approx_clustering.approx_clustering(graph, eps, delta, workers, seed)
 
+        return buckets['k'], buckets['C']
 
+
+    @traced
     def network_growth(df):
 
         time = df['TIME']
@@ -86,44 +135,75 @@ class Distribution:
         sum_edges = np.cumsum(df['SOURCE']/df['SOURCE'])
         norm_edges = (sum_edges - sum_edges.min()) / (sum_edges.max() - sum_edges.min())
 
-        sum_ratings = np.cumsum(df['RATING'])
+        # Widened first, compact int8 ratings would overflow the running sum
+        sum_ratings = np.cumsum(df['RATING'].astype(np.int64))
         norm_ratings = (sum_ratings  -  sum_ratings.min()) / (sum_ratings.max() -  sum_ratings.min())
 
         return time, norm_edges, norm_ratings
 
 
-    # Return top 10 users with highest number of interactions on network 
+    # In, out and total interactions for every node in one pass
+    @traced
+    def interaction_counts(df):
+
+        source = df['SOURCE'].to_numpy()
+        target = df['TARGET'].to_numpy()
+
+        # Dense ids so users who only receive ratings are counted too
+        nodes, inverse = np.unique(np.concatenate([source, target]), return_inverse=True)
+        n = len(nodes)
+
+        num_out = np.bincount(inverse[:len(source)], minlength=n)
+        num_in = np.bincount(inverse[len(source):], minlength=n)
+
+        counts = pd.DataFrame({'User': nodes,
+                               'In': num_in,
+                               'Out': num_out,
+                               'Num Interactions': num_in + num_out})
+        return counts
+
+
+    # Return the k users with the highest number of interactions on network
+    @traced
+    def top_k_users(df, k=5, by='Num Interactions', counts=None):
+
+        if by not in ('In', 'Out', 'Num Interactions'):
+            raise ValueError(f"by must be 'In', 'Out' or 'Num Interactions', not {by!r}")
+
+        if counts is None:
+            counts = Distribution.interaction_counts(df)
+
+        # Highest count first, ties broken by the lower user id
+        order = np.lexsort((counts['User'].to_numpy(), -counts[by].to_numpy()))[:k]
+
+        return counts['User'].iloc[order].reset_index(drop=True)
+
+
+    # Return top 5 users with highest number of interactions on network
+    @traced
     def top_5_users_k(df):
+        return Distribution.top_k_users(df, 5)
 
-        users = df['SOURCE'].unique() 
         
-        tot_inter = [] 
-        for i in users:
-            num_ratings_out = len((df[df['SOURCE'] == i])['TARGET']) 
-            num_ratings_in = len((df[df['TARGET'] == i])['SOURCE']) 
-            
-            tot = num_ratings_out + num_ratings_in 
-            tot_inter.append(tot)
-
-        data = list(zip(users, tot_inter))
-        info = pd.DataFrame(data, columns=['User', 'Num Interactions'])
-        sorted_users = info.sort_values('Num Interactions', ascending=False)    
-        return (sorted_users.head(5))['User']
+    # Cumulative degree over time of a user, sliced from a UserIndex when given
+    @traced
+    def k_vs_t(user, df, index=None):
 
-        
-    def k_vs_t(user, df):
+        if index is not None:
+            return index.k_vs_t(user)
 
         in_user_data = df[df['SOURCE'] == user]
         out_user_data = df[df['TARGET'] == user]
 
-        k_in = np.cumsum(in_user_data['SOURCE'] / in_user_data['SOURCE'])
-        k_out = np.cumsum(out_user_data['TARGET'] / out_user_data['TARGET'])
+        k_in = pd.Series(np.arange(1, len(in_user_data) + 1), index=in_user_data.index)
+        k_out = pd.Series(np.arange(1, len(out_user_data) + 1), index=out_user_data.index)
 
         t_in = in_user_data['TIME']
         t_out = out_user_data['TIME']
 
         return t_in, t_out, k_in ,k_out
 
+    @traced
     def pref_attach(net):
 
         # Undirect the graph and store data in dataframe 
@@ -144,8 +224,84 @@ class Distribution:
 
         vals = vals.sort_values(by = ['k'])
         return vals['k'], np.cumsum(vals['pref_attach'])
-        
 
+
+    # Attachment rate Pi(k) measured by replaying the edges in TIME order
+    # (Jeong et al. 2003). A new edge to a node that already existed counts
+    # as a gain at the node's degree just before it. Exposure is the number
+    # of edge arrivals a node spent at degree k, so Pi(k) = gains / exposure
+    # is the chance that a given node of degree k receives the next edge
+    @traced
+    def attachment_rates(df, degree='in'):
+
+        # Edges in arrival order, a pair rated again adds no edge
+        df = df.sort_values('TIME', kind='stable')
+        nodes, inverse = np.unique(np.concatenate([df['SOURCE'].to_numpy(), df['TARGET'].to_numpy()]),
+                                   return_inverse=True)
+        n, m = len(nodes), len(df)
+        _, first_rating = np.unique(inverse[:m] * n + inverse[m:], return_index=True)
+        first_rating.sort()
+        source, target = inverse[:m][first_rating], inverse[m:][first_rating]
+        m = len(source)
+        arrival = np.arange(m)
+
+        # Arrival at which every node first appears
+        seen = np.concatenate([source, target])
+        order = np.argsort(np.concatenate([arrival, arrival]), kind='stable')
+        first_node, first_pos = np.unique(seen[order], return_index=True)
+        appears = np.empty(n, dtype=np.int64)
+        appears[first_node] = np.concatenate([arrival, arrival])[order][first_pos]
+
+        # Degree increments, the source's too when counting total degree
+        if degree == 'in':
+            node, when, gained = target, arrival, np.ones(m, dtype=bool)
+        else:
+            node = np.concatenate([target, source])
+            when = np.concatenate([arrival, arrival])
+            gained = np.concatenate([np.ones(m, dtype=bool), np.zeros(m, dtype=bool)])
+
+        # One sorted pass: the rank of an increment within its node is the
+        # node's degree just before it
+        order = np.lexsort((when, node))
+        node, when, gained = node[order], when[order], gained[order]
+        starts = np.concatenate([[0], np.cumsum(np.bincount(node, minlength=n))])
+        k = np.arange(len(node)) - starts[node]
+
+        # Time spent at k ends with the increment, it began at the previous
+        # increment of the node or at its first appearance
+        previous = np.concatenate([[0], when[:-1]])
+        previous[starts[:-1][np.diff(starts) > 0]] = appears[node[starts[:-1][np.diff(starts) > 0]]]
+
+        # And every node sits at its final degree until the last arrival
+        final = np.diff(starts)
+        last = appears.copy()
+        has = final > 0
+        last[has] = when[starts[1:][has] - 1]
+
+        size = final.max(initial=0) + 1
+        gains = np.bincount(k[gained & (when > appears[node])], minlength=size)
+        exposure = (np.bincount(k, weights=when - previous, minlength=size) +
+                    np.bincount(final, weights=(m - 1) - last, minlength=size))
+
+        rates = pd.DataFrame({'k': np.arange(size), 'gains': gains, 'exposure': exposure})
+        rates = rates[rates['exposure'] > 0].reset_index(drop=True)
+        rates['pi'] = rates['gains'] / rates['exposure']
+        return rates
+
+
+    # Cumulative attachment rate kappa(k) = sum of Pi(k') for k' <= k, which
+    # grows as k^(alpha + 1) when Pi(k) ~ k^alpha. k = 0 is left out for log axes
+    @traced
+    def pref_attach_temporal(df, degree='in'):
+
+        rates = Distribution.attachment_rates(df, degree)
+        kappa = np.cumsum(rates['pi'])
+        positive = rates['k'] > 0
+
+        return rates['k'][positive], kappa[positive]
+
+
+    @traced
     def num_ratings_over_time(df):
         num_ratings = np.cumsum(df['TARGET'] /  df['TARGET'])
         return df['TIME'], num_ratings
\ No newline at end of file
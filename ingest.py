@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+import numpy as np
+from instrument import span, traced
+from lazy import lazy_import
+
+nx = lazy_import('networkx')
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Ingestion
+-------------------------------------------
+Parses the rating csv once into a columnar
+.npz cache stored next to it (int32 ids,
+int8 ratings, int64 epoch nanoseconds).
+Later runs load the cache instead of calling
+pd.read_csv and pd.to_datetime again. The
+cache is rebuilt when the size, mtime and
+hash of the csv no longer match.
+'''
+
+CACHE_VERSION = 2
+COLUMNS = ['SOURCE', 'TARGET', 'RATING', 'TIME']
+
+# Ratings run from -MAX_RATING to MAX_RATING, zero is never given
+MAX_RATING = 10
+
+
+def cache_path(path):
+    return f'{path}.cache.npz'
+
+
+# SHA-256 of a file, read in blocks
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_stat(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+# Smallest of the given integer types that holds the values exactly
+def compact(values, dtypes):
+    if not np.issubdtype(values.dtype, np.integer):
+        return values
+
+    for dtype in dtypes:
+        info = np.iinfo(dtype)
+        if len(values) == 0 or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values
+
+
+# True when the file starts with a data row, as the raw SNAP downloads do
+def headerless(path):
+    first = pd.read_csv(path, sep=',', header=None, nrows=1)
+    return pd.api.types.is_numeric_dtype(first[0])
+
+
+# Parse the csv (or .csv.gz) into compact column arrays
+def parse_csv(path):
+    with span('read_csv', path=path):
+        if headerless(path):
+            df = pd.read_csv(path, sep=',', header=None, names=COLUMNS)
+        else:
+            df = pd.read_csv(path, sep=',')
+
+    with span('to_datetime'):
+        time = pd.to_datetime(df['TIME'], unit='s').to_numpy().astype('datetime64[ns]').view(np.int64)
+
+    return {'SOURCE': compact(df['SOURCE'].to_numpy(), [np.int32]),
+            'TARGET': compact(df['TARGET'].to_numpy(), [np.int32]),
+            'RATING': compact(df['RATING'].to_numpy(), [np.int8, np.int16]),
+            'TIME': time}
+
+
+# Written under a name unique to the writer, so processes loading the same
+# csv for the first time never share a temporary file
+def write_cache(path, columns, meta):
+    target = cache_path(path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)),
+                               prefix=os.path.basename(target), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **columns)
+        os.replace(tmp, target)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+# Cached columns if they still describe the csv, else None
+def read_cache(path, stat):
+    target = cache_path(path)
+    if not os.path.exists(target):
+        return None
+
+    # A partly written or corrupt cache is parsed again
+    try:
+        with np.load(target) as cached:
+            meta = json.loads(str(cached['meta']))
+            columns = {c: cached[c] for c in COLUMNS}
+    except Exception:
+        return None
+
+    if meta.get('version') != CACHE_VERSION or meta.get('size') != stat['size']:
+        return None
+
+    # Same size but touched since, only trust the cache if the content is unchanged
+    if meta.get('mtime_ns') != stat['mtime_ns']:
+        if meta.get('sha256') != file_hash(path):
+            return None
+        write_cache(path, columns, dict(meta, **stat))
+
+    return columns
+
+
+# Compact column arrays of the rating file, parsed at most once
+@traced
+def load_arrays(path='bitcoinotc.csv'):
+    stat = file_stat(path)
+
+    columns = read_cache(path, stat)
+    if columns is None:
+        columns = parse_csv(path)
+        meta = dict(stat, version=CACHE_VERSION, sha256=file_hash(path))
+        write_cache(path, columns, meta)
+
+    return columns
+
+
+# SHA-256 of the rating file, read from a valid cache instead of rehashing
+def dataset_hash(path='bitcoinotc.csv'):
+    load_arrays(path)
+    with np.load(cache_path(path)) as cached:
+        return json.loads(str(cached['meta']))['sha256']
+
+
+# Ratings dataframe as given by pd.read_csv followed by pd.to_datetime on TIME
+@traced
+def load_ratings(path='bitcoinotc.csv'):
+    return ratings_frame(load_arrays(path))
+
+
+# Ratings dataframe of compact column arrays, ids and ratings widened to int64
+def ratings_frame(columns):
+    widen = lambda a: a.astype(np.int64) if np.issubdtype(a.dtype, np.integer) else a
+
+    return pd.DataFrame({'SOURCE': widen(columns['SOURCE']),
+                         'TARGET': widen(columns['TARGET']),
+                         'RATING': widen(columns['RATING']),
+                         'TIME': columns['TIME'].view('datetime64[ns]')})
+
+
+# Sorted node ids and the int32 dense ids of source and target. Ids that
+# fit a lookup table of a few times the edge count are relabelled through
+# it in linear time, others fall back to np.unique
+def dense_ids(source, target):
+    m = len(source)
+    if m and np.issubdtype(source.dtype, np.integer) and min(source.min(), target.min()) >= 0 \
+            and max(source.max(), target.max()) < 4 * m + 1024:
+        present = np.zeros(int(max(source.max(), target.max())) + 1, dtype=bool)
+        present[source] = True
+        present[target] = True
+        nodes = np.flatnonzero(present).astype(source.dtype)
+        lookup = (np.cumsum(present, dtype=np.int32) - 1)
+        return nodes, lookup[source], lookup[target]
+
+    nodes, inverse = np.unique(np.concatenate([source, target]), return_inverse=True)
+    return nodes, inverse[:m].astype(np.int32), inverse[m:].astype(np.int32)
+
+
+# Ratings held compactly: dense int32 node ids, int8 ratings and int64 epoch
+# nanoseconds. Subsets such as the positive ratings are boolean masks over
+# the same arrays rather than filtered copies
+class Ratings:
+
+    def __init__(self, source, target, rating, time):
+        self.nodes, self.source, self.target = dense_ids(np.asarray(source), np.asarray(target))
+        self.rating = compact(np.asarray(rating), [np.int8, np.int16])
+        self.time = np.asarray(time, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.rating)
+
+    def positive(self):
+        return self.rating > 0
+
+    def negative(self):
+        return self.rating < 0
+
+    # Ratings under a mask, or all of them, as compact arrays
+    def select(self, mask=None):
+        if mask is None:
+            return self.source, self.target, self.rating, self.time
+        return self.source[mask], self.target[mask], self.rating[mask], self.time[mask]
+
+    # Frame with the original node ids and compact columns. Sums over RATING
+    # must widen it first, an int8 cumsum overflows
+    def frame(self, mask=None, datetimes=False):
+        source, target, rating, time = self.select(mask)
+        return pd.DataFrame({'SOURCE': self.nodes[source],
+                             'TARGET': self.nodes[target],
+                             'RATING': rating,
+                             'TIME': self.datetimes(time) if datetimes else time})
+
+    # Epoch nanoseconds as datetimes, for display only
+    def datetimes(self, time=None):
+        return (self.time if time is None else time).view('datetime64[ns]')
+
+    def memory_usage(self):
+        return sum(a.nbytes for a in (self.nodes, self.source, self.target, self.rating, self.time))
+
+
+# Compact ratings of a rating file, see Ratings
+@traced
+def load_compact(path='bitcoinotc.csv'):
+    columns = load_arrays(path)
+    return Ratings(columns['SOURCE'], columns['TARGET'], columns['RATING'], columns['TIME'])
+
+
+# Directed rating graph of a ratings dataframe
+@traced
+def build_graph(df):
+    return nx.from_pandas_edgelist(df,
+                                   source='SOURCE',
+                                   target='TARGET',
+                                   edge_attr='RATING',
+                                   create_using=nx.DiGraph)
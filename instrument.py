@@ -0,0 +1,287 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Instrumentation
+-------------------------------------------
+Opt-in timing spans for the hot paths:
+ingestion, graph construction, Distribution
+methods and figure rendering. Spans nest,
+record wall time and peak traced memory, and
+are written as a Chrome trace (load it in
+chrome://tracing or ui.perfetto.dev). A
+sampling or cProfile profiler can run at the
+same time. When off, a span is a shared
+no-op context and a traced function costs
+one flag check per call.
+
+    OTC_TRACE=trace.json python bitcoin_otc.py
+    OTC_TRACE=trace.json OTC_PROFILE=stacks.txt python render.py --force
+'''
+
+TRACE_ENV = 'OTC_TRACE'
+MEMORY_ENV = 'OTC_TRACE_MEMORY'
+PROFILE_ENV = 'OTC_PROFILE'
+
+
+class _State:
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.trace_path = None
+        # perf_counter is the system wide monotonic clock on Linux, so events
+        # from worker processes line up with the parent's
+        self.events = []
+        self.local = threading.local()
+        self.profiler = None
+
+
+_state = _State()
+
+
+# Does nothing, returned by span() while instrumentation is off
+class _NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.peak = 0
+
+    def __enter__(self):
+        stack = _stack()
+
+        # Fold the peak reached so far into the parent before measuring this span
+        if _state.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.base = current
+            self.peak = current
+
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        stack = _stack()
+        stack.pop()
+
+        args = dict(self.args)
+        if _state.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            args['peak_mb'] = (self.peak - self.base) / (1 << 20)
+
+            # The parent's peak includes everything allocated inside this span
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+            tracemalloc.reset_peak()
+
+        _state.events.append({'name': self.name, 'ph': 'X', 'pid': os.getpid(),
+                              'tid': threading.get_ident(),
+                              'ts': self.start * 1e6,
+                              'dur': (end - self.start) * 1e6, 'args': args})
+        return False
+
+
+def _stack():
+    stack = getattr(_state.local, 'stack', None)
+    if stack is None:
+        stack = _state.local.stack = []
+    return stack
+
+
+def enabled():
+    return _state.enabled
+
+
+# Timing span around a block, e.g. with span('load', path=path): ...
+def span(name, **args):
+    if not _state.enabled:
+        return _NULL_SPAN
+    return Span(name, args)
+
+
+# Decorator wrapping every call of a function in a span named after it
+def traced(func=None, name=None):
+    if func is None:
+        return functools.partial(traced, name=name)
+
+    label = name or func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _state.enabled:
+            return func(*args, **kwargs)
+        with Span(label, {}):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+# Samples the stack of one thread at a fixed interval and counts the
+# collapsed stacks, written in the folded format read by flamegraph.pl
+class Sampler:
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+# Profiler given by a file name: .prof runs cProfile, anything else samples
+class Profiler:
+
+    def __init__(self, path, interval=0.005):
+        self.path = path
+        self.profile = cProfile.Profile() if path.endswith('.prof') else None
+        self.sampler = None if self.profile else Sampler(interval)
+
+    def start(self):
+        if self.profile:
+            self.profile.enable()
+        else:
+            self.sampler.start()
+
+    def stop(self):
+        if self.profile:
+            self.profile.disable()
+            self.profile.dump_stats(self.path)
+        else:
+            self.sampler.stop()
+            self.sampler.write(self.path)
+
+
+# Turn spans on. trace is written at exit, memory tracks peaks with
+# tracemalloc (slows allocation heavy code), profile starts a profiler
+def enable(trace=None, memory=True, profile=None):
+    if _state.enabled:
+        return
+
+    _state.enabled = True
+    _state.trace_path = trace
+    _state.memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    if profile:
+        _state.profiler = Profiler(profile)
+        _state.profiler.start()
+
+    atexit.register(disable)
+
+
+# Turn spans off, stop the profiler and write the trace
+def disable():
+    if not _state.enabled:
+        return
+
+    _state.enabled = False
+    if _state.profiler:
+        _state.profiler.stop()
+        _state.profiler = None
+    if _state.memory:
+        tracemalloc.stop()
+    if _state.trace_path:
+        write_trace(_state.trace_path)
+
+
+# Events recorded by this process, removed so a worker can send them back.
+# A forked worker starts with a copy of its parent's events, those are dropped
+def drain():
+    pid = os.getpid()
+    events = [e for e in _state.events if e['pid'] == pid]
+    _state.events = []
+    return events
+
+
+# Add events recorded in another process
+def extend(events):
+    _state.events.extend(events)
+
+
+def write_trace(path):
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': _state.events, 'displayTimeUnit': 'ms'}, f)
+
+
+# Calls, total and longest wall time, and largest peak memory of every span name
+def summary(events=None):
+    events = _state.events if events is None else events
+    if not events:
+        return pd.DataFrame(columns=['name', 'calls', 'total_s', 'max_s', 'peak_mb'])
+
+    df = pd.DataFrame({'name': [e['name'] for e in events],
+                       'dur': [e['dur'] / 1e6 for e in events],
+                       'peak_mb': [e['args'].get('peak_mb', float('nan')) for e in events]})
+    table = df.groupby('name').agg(calls=('dur', 'size'), total_s=('dur', 'sum'),
+                                   max_s=('dur', 'max'), peak_mb=('peak_mb', 'max'))
+    return table.sort_values('total_s', ascending=False).reset_index()
+
+
+# Switch on from the environment. Called by the scripts' main(), never on
+# import, so a library user or a pool worker is not traced behind its back
+def from_env():
+    if os.environ.get(TRACE_ENV) or os.environ.get(PROFILE_ENV):
+        enable(trace=os.environ.get(TRACE_ENV) or None,
+               memory=os.environ.get(MEMORY_ENV, '1') != '0',
+               profile=os.environ.get(PROFILE_ENV) or None)
@@ -0,0 +1,46 @@
+import importlib
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Lazy Imports
+-------------------------------------------
+Stand-in for a module that is only imported
+on first attribute access, so the compute
+code can be imported without paying for
+networkx or matplotlib until they are used.
+
+    nx = lazy_import('networkx')
+'''
+
+
+class LazyModule:
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+def lazy_import(name):
+    return LazyModule(name)
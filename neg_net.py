@@ -1,36 +1,30 @@
-import networkx as nx 
-import pandas as pd 
 from distro import Distribution
-import numpy as np
-import matplotlib.pyplot  as plt 
+from ingest import load_compact
+from signed_graph import SignedGraph
+from plotting import finish, plt
+from instrument import from_env
 
 
 def main(): 
+    from_env()
     
-    # Load data into a dataframe
-    df = pd.read_csv('bitcoinotc.csv', sep=',')
+    # Compact ratings: dense int32 ids, int8 ratings, int64 epoch times
+    ratings = load_compact('bitcoinotc.csv')
 
-    # Convert time from epoch to readable dates
-    df['TIME'] = pd.to_datetime(df['TIME'],unit='s')
-
-    # Load data into graph 
-    neg_ratings_df = df[df['RATING'] < 0]
-    neg_net = nx.from_pandas_edgelist(  neg_ratings_df,
-                                        source='SOURCE',
-                                        target='TARGET',
-                                        edge_attr='RATING',
-                                        create_using=nx.DiGraph)
+    # Load data into graph, L- is a view of the full rating graph
+    graph = SignedGraph.from_ratings(ratings)
+    neg_net = graph.negative()
 
 
     #############################   NEGATIVE RATINGS    ##############################
 
-    neg_in_degree_df = pd.DataFrame(neg_net.in_degree, columns=['node', 'degree']).sort_values(by='node')
-    neg_out_degree_df = pd.DataFrame(neg_net.out_degree, columns=['node', 'degree']).sort_values(by='node')
+    neg_in_degree_df = neg_net.degree_frame('in')
+    neg_out_degree_df = neg_net.degree_frame('out')
     neg_mean_in_degree = neg_in_degree_df['degree'].mean()
     neg_mean_out_degree = neg_out_degree_df['degree'].mean()
 
 
-    neg_rate_CC = pd.DataFrame(nx.clustering(neg_net).items(), columns=['node', 'CC']).sort_values(by='node')
+    neg_rate_CC = neg_net.clustering()
     avg_neg_CC = neg_rate_CC['CC'].mean()
 
     # Distributions of in and out degrees 
@@ -39,14 +33,15 @@ def main():
 
     #plot_pdf(in_distro, out_distro)
     #plot_ccdf(in_distro, out_distro)
-    #CC_vs_degree(neg_net)
+    #CC_vs_degree(neg_net.to_networkx())
 
-def CC_vs_degree(net):
+def CC_vs_degree(net=None, path=None, cc=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
     plt.title(r'ABC123 vs $\mathrm{ABC123}^{123}$')
 
-    x,y = Distribution.cc_by_degree(net)
+    # Precomputed (degrees, average cc) when given
+    x,y = cc if cc is not None else Distribution.cc_by_degree(net)
 
     plt.scatter(x,y,  s = 12, color = 'red')
     plt.xlabel(r'$k$', fontsize=14)
@@ -55,12 +50,13 @@ def CC_vs_degree(net):
     plt.xscale('log')
     plt.grid(True)
     plt.title(r'Average Clustering Coefficient vs Degree for $L_{-}$',  fontsize=16)
-    plt.show()
+    finish(path)
 
 
  # Plots probability density function (PDF)
-def plot_pdf(in_degree_dist, out_degree_dist):
-    plt.rcParams['text.usetex'] = True
+def plot_pdf(in_degree_dist, out_degree_dist, path=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
     # Plotting data 
     fig1 = plt.figure(1, figsize=(8, 6), dpi=100)
 
@@ -81,11 +77,12 @@ def plot_pdf(in_degree_dist, out_degree_dist):
     plt.grid(True)
     plt.legend()
     plt.title("$L_{-}$ Degree Distribution", fontsize=18)
-    plt.show() 
+    finish(path)
 
  # Plots probability density function (PDF)
-def plot_ccdf(in_degree_dist, out_degree_dist):
-    plt.rcParams['text.usetex'] = True
+def plot_ccdf(in_degree_dist, out_degree_dist, path=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
     # Plotting data 
     fig2 = plt.figure(2, figsize=(8, 6), dpi=100)
     
@@ -114,7 +111,7 @@ def plot_ccdf(in_degree_dist, out_degree_dist):
     plt.grid(True)
     plt.legend()
     plt.title("CCDF of $L_{-}$", fontsize=18)
-    plt.show() 
+    finish(path)
 
 
 
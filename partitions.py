@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import numpy as np
+from ingest import COLUMNS, dataset_hash, file_hash, file_stat, load_arrays, ratings_frame
+from instrument import from_env, span, traced
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Time Partitions
+-------------------------------------------
+The ratings split by TIME into one directory
+of .npy column files per month (or quarter,
+year) next to the csv, with the first and
+last TIME of every partition in meta.json.
+A range query only opens the partitions that
+overlap it, memory-mapped, and trims the two
+ends with a binary search on TIME, so the
+rest of the history is never read. Mapped
+pages are shared by every process reading
+the same partitions.
+
+Rows are stably sorted by TIME, which is the
+file order of the SNAP dumps.
+
+    python partitions.py bitcoinotc.csv --freq M
+    python partitions.py bitcoinotc.csv --start 2011-01-01 --end 2011-04-01
+
+    Distribution.network_growth(load_range('bitcoinotc.csv', '2011-01-01', '2011-04-01'))
+'''
+
+PARTITION_VERSION = 1
+
+
+def partition_root(path):
+    return f'{path}.parts'
+
+
+# Start of every period from the first to the last rating, and the end of the last
+def period_bounds(time, freq):
+    if len(time) == 0:
+        return np.zeros(0, dtype=np.int64), []
+
+    first, last = pd.Timestamp(time[0]), pd.Timestamp(time[-1])
+    periods = pd.period_range(first, last, freq=freq)
+    bounds = np.append(periods.start_time.to_numpy(), periods[-1].end_time.to_datetime64() + 1)
+    return bounds.astype('datetime64[ns]').view(np.int64), [str(p) for p in periods]
+
+
+# Write the partitions of a rating file into a fresh directory next to the
+# old ones and install it with install(). rebuild replaces partitions of
+# the same data too, otherwise another process's matching build is kept
+@traced
+def write_partitions(path, freq='M', rebuild=False):
+    columns = load_arrays(path)
+    root = partition_root(path)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(root)),
+                           prefix=f'{os.path.basename(root)}.', suffix='.tmp')
+    try:
+        time = columns['TIME']
+        if len(time) and np.any(time[1:] < time[:-1]):
+            order = np.argsort(time, kind='stable')
+            columns = {c: columns[c][order] for c in COLUMNS}
+            time = columns['TIME']
+
+        bounds, names = period_bounds(time, freq)
+        cuts = np.searchsorted(time, bounds, side='left')
+
+        parts = []
+        for name, lo, hi in zip(names, cuts[:-1], cuts[1:]):
+            if hi == lo:
+                continue
+
+            os.makedirs(os.path.join(tmp, name))
+            for c in COLUMNS:
+                np.save(os.path.join(tmp, name, f'{c}.npy'), columns[c][lo:hi])
+            parts.append({'name': name, 'rows': int(hi - lo),
+                          'min_time': int(time[lo]), 'max_time': int(time[hi - 1])})
+
+        meta = dict(file_stat(path), version=PARTITION_VERSION, freq=freq, sha256=dataset_hash(path),
+                    dtypes={c: columns[c].dtype.str for c in COLUMNS}, partitions=parts)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+
+        return install(tmp, root, meta, rebuild)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+# Rename a finished build to root and return the meta of what is installed.
+# The rename only succeeds while root is free, so of concurrent builds one
+# wins and the others find its matching partitions and drop their own. An
+# outdated root is renamed aside before it is removed, so readers never see
+# a partly deleted tree
+def install(tmp, root, meta, rebuild=False):
+    old = f'{tmp}.old'
+    try:
+        while True:
+            try:
+                os.rename(tmp, root)
+                return meta
+            except OSError:
+                if not os.path.isdir(root):
+                    raise
+
+            installed = load_meta(root)
+            if not rebuild and same_data(installed, meta):
+                shutil.rmtree(tmp, ignore_errors=True)
+                return installed
+
+            shutil.rmtree(old, ignore_errors=True)
+            try:
+                os.rename(root, old)
+            except FileNotFoundError:
+                pass
+            rebuild = False
+    finally:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+# Both partition metadata describe the same ratings split the same way
+def same_data(meta, other):
+    if meta is None or other is None:
+        return False
+    return all(meta.get(k) == other.get(k) for k in ('version', 'freq', 'sha256'))
+
+
+# Contents of meta.json in a partition directory, None if it is missing
+def load_meta(root):
+    try:
+        with open(os.path.join(root, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Partition metadata if it still describes the csv, else None
+def read_meta(path, freq):
+    meta = load_meta(partition_root(path))
+    if meta is None:
+        return None
+
+    stat = file_stat(path)
+    if meta.get('version') != PARTITION_VERSION or meta.get('freq') != freq or meta.get('size') != stat['size']:
+        return None
+
+    # Hash the csv only when it was touched since, as ingest.read_cache does,
+    # and store the new mtime when the content is unchanged so later runs
+    # skip the hash again
+    if meta.get('mtime_ns') != stat['mtime_ns']:
+        if meta.get('sha256') != file_hash(path):
+            return None
+        meta.update(stat)
+        write_meta(path, meta)
+    return meta
+
+
+# Replace meta.json in one step, readers never see a partial file. The
+# stored mtime only saves a later hash, so a directory that cannot be
+# written to is left as it is
+def write_meta(path, meta):
+    root = partition_root(path)
+    try:
+        fd, tmp = tempfile.mkstemp(dir=root, suffix='.tmp')
+    except OSError:
+        return
+
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp, os.path.join(root, 'meta.json'))
+    except OSError:
+        discard(tmp)
+    except BaseException:
+        discard(tmp)
+        raise
+
+
+def discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Epoch nanoseconds of a timestamp-like bound, None for an open end
+def to_epoch(value, default):
+    if value is None:
+        return default
+    return int(pd.Timestamp(value).to_datetime64().astype('datetime64[ns]').view(np.int64))
+
+
+class PartitionStore:
+
+    def __init__(self, path='bitcoinotc.csv', freq='M'):
+        meta = read_meta(path, freq)
+        if meta is None:
+            meta = write_partitions(path, freq)
+
+        self.root = partition_root(path)
+        self.freq = freq
+        self.dtypes = {c: np.dtype(d) for c, d in meta['dtypes'].items()}
+        self.table = pd.DataFrame(meta['partitions'], columns=['name', 'rows', 'min_time', 'max_time'])
+
+    # Names of the partitions with a rating in [start, end)
+    def overlapping(self, start=None, end=None):
+        lo = to_epoch(start, np.iinfo(np.int64).min)
+        hi = to_epoch(end, np.iinfo(np.int64).max)
+        hit = (self.table['max_time'] >= lo) & (self.table['min_time'] < hi)
+        return self.table['name'][hit].tolist()
+
+    # Memory-mapped columns of one partition
+    def partition(self, name, columns=COLUMNS):
+        return {c: np.load(os.path.join(self.root, name, f'{c}.npy'), mmap_mode='r') for c in columns}
+
+    # Compact column arrays of the ratings in [start, end). Only the rows in
+    # range are copied out of the mapped partitions
+    @traced
+    def arrays(self, start=None, end=None, columns=COLUMNS):
+        lo = to_epoch(start, np.iinfo(np.int64).min)
+        hi = to_epoch(end, np.iinfo(np.int64).max)
+
+        pieces = {c: [] for c in columns}
+        for name in self.overlapping(start, end):
+            part = self.partition(name, set(columns) | {'TIME'})
+            time = part['TIME']
+            a, b = np.searchsorted(time, lo, side='left'), np.searchsorted(time, hi, side='left')
+            for c in columns:
+                pieces[c].append(part[c][a:b])
+
+        with span('concatenate', partitions=len(pieces[columns[0]])):
+            return {c: np.concatenate(p) if p else np.zeros(0, dtype=self.dtypes[c]) for c, p in pieces.items()}
+
+    # Ratings dataframe of [start, end), as load_ratings gives for the whole file
+    def frame(self, start=None, end=None):
+        return ratings_frame(self.arrays(start, end))
+
+
+# Ratings in [start, end) of a rating file, partitioning it on first use
+def load_range(path='bitcoinotc.csv', start=None, end=None, freq='M'):
+    return PartitionStore(path, freq).frame(start, end)
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='bitcoinotc.csv')
+    parser.add_argument('--freq', default='M', help='pandas period frequency, M, Q or Y')
+    parser.add_argument('--start', help='first day of the range')
+    parser.add_argument('--end', help='day after the range')
+    parser.add_argument('--rebuild', action='store_true')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        write_partitions(args.path, args.freq, rebuild=True)
+    store = PartitionStore(args.path, args.freq)
+    print(f'{len(store.table)} partitions, {store.table["rows"].sum()} ratings in {store.root}')
+
+    if args.start or args.end:
+        names = store.overlapping(args.start, args.end)
+        df = store.frame(args.start, args.end)
+        print(f'{len(df)} ratings from {len(names)} partitions ({", ".join(names)})')
+
+
+if __name__ == '__main__':
+    main()
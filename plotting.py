@@ -0,0 +1,34 @@
+from instrument import span
+from lazy import lazy_import
+
+matplotlib = lazy_import('matplotlib')
+plt = lazy_import('matplotlib.pyplot')
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Plot Output
+-------------------------------------------
+Shared ending for the plot functions: show
+the figure interactively, or save it and
+close it when a path is given. pyplot is
+only imported when the first figure is made.
+'''
+
+
+# Draw on the Agg backend, must run before the first figure
+def headless():
+    matplotlib.use('Agg')
+
+
+# Show the current figure, or save it to path when rendering headless
+def finish(path=None):
+    if path is None:
+        plt.show()
+    else:
+        with span('savefig', path=path):
+            plt.savefig(path)
+        plt.close('all')
@@ -1,8 +1,8 @@
-import networkx as nx 
-import pandas as pd 
 from distro import Distribution
-import numpy as np
-import matplotlib.pyplot  as plt 
+from ingest import load_compact
+from signed_graph import SignedGraph
+from plotting import finish, plt
+from instrument import from_env
 
 
 '''
@@ -19,31 +19,25 @@ http://snap.stanford.edu/data/index.html
 '''
 
 def main(): 
+    from_env()
     
-    # Load data into a dataframe
-    df = pd.read_csv('bitcoinotc.csv', sep=',')
+    # Compact ratings: dense int32 ids, int8 ratings, int64 epoch times
+    ratings = load_compact('bitcoinotc.csv')
 
-    # Convert time from epoch to readable dates
-    df['TIME'] = pd.to_datetime(df['TIME'],unit='s')
-
-    # Load data into graph 
-    pos_ratings_df = df[df['RATING'] > 0]
-    pos_net = nx.from_pandas_edgelist(  pos_ratings_df,
-                                        source='SOURCE',
-                                        target='TARGET',
-                                        edge_attr='RATING',
-                                        create_using=nx.DiGraph)
+    # Load data into graph, L+ is a view of the full rating graph
+    graph = SignedGraph.from_ratings(ratings)
+    pos_net = graph.positive()
 
 
     #############################   POSITIVE RATINGS    ##############################
 
-    pos_in_degree_df = pd.DataFrame(pos_net.in_degree, columns=['node', 'degree']).sort_values(by='node')
-    pos_out_degree_df = pd.DataFrame(pos_net.out_degree, columns=['node', 'degree']).sort_values(by='node')
+    pos_in_degree_df = pos_net.degree_frame('in')
+    pos_out_degree_df = pos_net.degree_frame('out')
     pos_mean_in_degree = pos_in_degree_df['degree'].mean()
     pos_mean_out_degree = pos_out_degree_df['degree'].mean()
 
 
-    pos_rate_CC = pd.DataFrame(nx.clustering(pos_net).items(), columns=['node', 'CC']).sort_values(by='node')
+    pos_rate_CC = pos_net.clustering()
     avg_pos_CC = pos_rate_CC['CC'].mean()
 
     # Distributions of in and out degrees 
@@ -52,16 +46,17 @@ def main():
 
     #plot_pdf(in_distro, out_distro)
     #plot_ccdf(in_distro, out_distro)
-    #plot_top10(df)
+    #plot_top10(ratings.frame())
 
-    #CC_vs_degree(pos_net)
+    #CC_vs_degree(pos_net.to_networkx())
 
-def CC_vs_degree(net):
+def CC_vs_degree(net=None, path=None, cc=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
     plt.title(r'ABC123 vs $\mathrm{ABC123}^{123}$')
 
-    x,y = Distribution.cc_by_degree(net)
+    # Precomputed (degrees, average cc) when given
+    x,y = cc if cc is not None else Distribution.cc_by_degree(net)
 
     plt.scatter(x,y,  s = 12, color = 'green')
     plt.xlabel(r'$k$', fontsize=14)
@@ -70,15 +65,15 @@ def CC_vs_degree(net):
     plt.xscale('log')
     plt.grid(True)
     plt.title(r'Average Clustering Coefficient vs Degree for $L_{+}$',  fontsize=16)
-    plt.show()
+    finish(path)
 
 
-def plot_top10(df):
+def plot_top10(df, table=None, path=None):
     plt.rcParams['mathtext.fontset'] = 'stix'
     plt.rcParams['font.family'] = 'STIXGeneral'
     plt.title(r'ABC123 vs $\mathrm{ABC123}^{123}$')
 
-    data = Distribution.overall_ratings(df)
+    data = Distribution.overall_ratings(df, table)
     data = data.sort_values(by='overall_rating', ascending=False)
 
     data['node'] = data['node'].astype(str)
@@ -87,7 +82,7 @@ def plot_top10(df):
     plt.bar(users['node'], users['overall_rating'], color='springgreen')
     plt.xlabel(r'ID', fontsize=16), plt.ylabel(r'Overall Rating', fontsize=16)
     plt.title(r'Top 10 Rated Users', fontsize=18)
-    plt.show()
+    finish(path)
 
 
 
@@ -95,8 +90,9 @@ def plot_top10(df):
 
 
  # Plots probability density function (PDF)
-def plot_pdf(in_degree_dist, out_degree_dist):
-    plt.rcParams['text.usetex'] = True
+def plot_pdf(in_degree_dist, out_degree_dist, path=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
     # Plotting data 
     fig1 = plt.figure(1, figsize=(8, 6), dpi=100)
 
@@ -117,12 +113,13 @@ def plot_pdf(in_degree_dist, out_degree_dist):
     plt.yscale('log'), plt.xscale('log')
     plt.grid(True)
     plt.legend()
-    plt.title("$L_{-}$ Degree Distribution", fontsize=18)
-    plt.show() 
+    plt.title("$L_{+}$ Degree Distribution", fontsize=18)
+    finish(path)
 
  # Plots probability density function (PDF)
-def plot_ccdf(in_degree_dist, out_degree_dist):
-    plt.rcParams['text.usetex'] = True
+def plot_ccdf(in_degree_dist, out_degree_dist, path=None):
+    plt.rcParams['mathtext.fontset'] = 'stix'
+    plt.rcParams['font.family'] = 'STIXGeneral'
     # Plotting data 
     fig2 = plt.figure(2, figsize=(8, 6), dpi=100)
     
@@ -151,7 +148,7 @@ def plot_ccdf(in_degree_dist, out_degree_dist):
     plt.grid(True)
     plt.legend()
     plt.title("CCDF of $L_{+}$", fontsize=18)
-    plt.show() 
+    finish(path)
 
 
 
@@ -0,0 +1,192 @@
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+import numpy as np
+from scipy.special import zeta
+from distro import Distribution
+from signed_graph import SignedGraph
+from instrument import from_env
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Power-Law Fits
+-------------------------------------------
+Discrete power-law fits of the degree
+distributions returned by
+Distribution.distributions, following
+Clauset, Shalizi and Newman (2009):
+
+ - alpha by maximum likelihood on a grid
+ - x_min by minimising the KS distance
+ - p-value from a semi-parametric bootstrap
+   run over a process pool
+'''
+
+ALPHAS = np.arange(1.01, 6.0, 0.005)
+
+# log zeta(alpha, x_min) over an alpha grid, cached per process since the
+# bootstrap fits keep scanning the same integer x_min values. The grid is
+# passed as bytes so it can be part of the key
+@lru_cache(maxsize=2048)
+def log_norm_row(x, grid):
+    return np.log(zeta(np.frombuffer(grid), x))
+
+
+def log_norm(xmin, alphas):
+    grid = np.ascontiguousarray(alphas, dtype=np.float64).tobytes()
+    return np.stack([log_norm_row(x, grid) for x in xmin.tolist()])
+
+
+# Degree of every node, expanded from a distributions table (k = 0 dropped)
+def degree_samples(dist):
+    k = dist.index.to_numpy()
+    n = dist['n'].to_numpy()
+    keep = k > 0
+    return np.repeat(k[keep], n[keep])
+
+
+# Best alpha and KS distance for every candidate x_min of the sorted data
+def scan(values, counts, min_tail=50, alphas=ALPHAS):
+
+    # Candidates are the distinct values with at least min_tail points above
+    n_tail = np.cumsum(counts[::-1])[::-1]
+    candidates = np.flatnonzero(n_tail >= min(min_tail, n_tail[0]))
+    xmin = values[candidates].astype(np.float64)
+
+    # Log-likelihood of every (x_min, alpha) pair, one row per candidate
+    log_sum = np.cumsum((counts * np.log(values))[::-1])[::-1][candidates]
+    likelihood = -alphas[None, :] * log_sum[:, None] - n_tail[candidates][:, None] * log_norm(xmin, alphas)
+    alpha = alphas[np.argmax(likelihood, axis=1)]
+
+    # Empirical and model CDF of every tail, evaluated at the distinct values
+    cum = np.cumsum(counts)
+    below = np.concatenate([[0], cum])[candidates]
+    emp = (cum[None, :] - below[:, None]) / n_tail[candidates][:, None]
+    model = 1 - zeta(alpha[:, None], values[None, :] + 1.0) / zeta(alpha[:, None], xmin[:, None])
+
+    in_tail = values[None, :] >= xmin[:, None]
+    ks = np.where(in_tail, np.abs(emp - model), 0).max(axis=1)
+
+    return pd.DataFrame({'xmin': values[candidates], 'alpha': alpha, 'ks': ks,
+                         'n_tail': n_tail[candidates]})
+
+
+# Power-law fit of a sample of positive integers. An alpha on the edge of
+# the grid is only a bound on the best one, so it is warned about
+def fit_samples(samples, min_tail=50, alphas=ALPHAS, warn=True):
+    values, counts = np.unique(samples, return_counts=True)
+    scores = scan(values, counts, min_tail, alphas)
+    best = scores.iloc[scores['ks'].to_numpy().argmin()]
+
+    if warn and best['alpha'] in (alphas[0], alphas[-1]):
+        warnings.warn(f'alpha {best["alpha"]:.3f} is on the edge of the grid [{alphas[0]:.3f}, '
+                      f'{alphas[-1]:.3f}], pass a wider alphas grid', RuntimeWarning, stacklevel=2)
+
+    return {'alpha': float(best['alpha']), 'xmin': int(best['xmin']), 'ks': float(best['ks']),
+            'n_tail': int(best['n_tail']), 'n': int(len(samples))}
+
+
+# Power-law fit of a distributions table
+def fit(dist, min_tail=50, alphas=ALPHAS):
+    return fit_samples(degree_samples(dist), min_tail, alphas)
+
+
+# Draws from a discrete power law above x_min, exact up to x_min + table_size
+# and from the continuous approximation of Clauset et al. beyond that
+def sample_power_law(alpha, xmin, size, rng, table_size=10**4):
+    x = np.arange(xmin, xmin + table_size, dtype=np.float64)
+    cdf = np.cumsum(x ** -alpha) / zeta(alpha, xmin)
+
+    r = rng.random(size)
+    pos = np.searchsorted(cdf, r)
+    out = x[np.minimum(pos, table_size - 1)]
+
+    beyond = pos == table_size
+    u = rng.random(beyond.sum())
+    out[beyond] = np.floor((xmin + table_size - 0.5) * (1 - u) ** (-1 / (alpha - 1)) + 0.5)
+
+    return out.astype(np.int64)
+
+
+# KS distances of num_resamples semi-parametric bootstrap fits
+def bootstrap_ks(samples, params, num_resamples, seed, min_tail=50, alphas=ALPHAS):
+    rng = np.random.default_rng(seed)
+    body = samples[samples < params['xmin']]
+    n = len(samples)
+    p_tail = params['n_tail'] / n
+
+    ks = np.empty(num_resamples)
+    for i in range(num_resamples):
+        n_tail = rng.binomial(n, p_tail) if len(body) else n
+        tail = sample_power_law(params['alpha'], params['xmin'], n_tail, rng)
+        resample = np.concatenate([rng.choice(body, n - n_tail) if len(body) else body, tail])
+        ks[i] = fit_samples(resample, min_tail, alphas, warn=False)['ks']
+
+    return ks
+
+
+# Fit with a bootstrap p-value, resamples are split across a process pool
+def fit_with_pvalue(dist, num_resamples=1000, workers=None, seed=0, min_tail=50, alphas=ALPHAS):
+    samples = degree_samples(dist)
+    params = fit_samples(samples, min_tail, alphas)
+
+    workers = workers or os.cpu_count() or 1
+    batches = [len(b) for b in np.array_split(np.arange(num_resamples), workers) if len(b)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+
+    with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+        jobs = [pool.submit(bootstrap_ks, samples, params, size, s, min_tail, alphas)
+                for size, s in zip(batches, seeds)]
+        ks = np.concatenate([job.result() for job in jobs])
+
+    params['p_value'] = float(np.mean(ks >= params['ks']))
+    params['num_resamples'] = num_resamples
+    return params
+
+
+# Fits for several distributions at once, e.g. {'G': ..., 'L+': ..., 'L-': ...}
+def fit_table(dists, num_resamples=1000, workers=None, seed=0, min_tail=50):
+    rows = {name: fit_with_pvalue(dist, num_resamples, workers, seed, min_tail)
+            for name, dist in dists.items()}
+    return pd.DataFrame(rows).T
+
+
+# PDF over logarithmic bins, counts divided by the number of integers in a bin
+def log_binned_pdf(dist, bins_per_decade=10):
+    k = dist.index.to_numpy()
+    n = dist['n'].to_numpy()
+    keep = k > 0
+    k, n = k[keep], n[keep]
+
+    decades = np.log10(k.max()) if k.max() > 1 else 1
+    edges = np.unique(np.ceil(np.logspace(0, decades, int(np.ceil(decades * bins_per_decade)) + 1)))
+    edges = np.append(edges[edges <= k.max()], k.max() + 1)
+
+    counts, _ = np.histogram(k, bins=edges, weights=n)
+    widths = np.diff(edges)
+    centres = np.sqrt(edges[:-1] * (edges[1:] - 1))
+
+    binned = pd.DataFrame({'k': centres, 'p': counts / widths / n.sum()})
+    return binned[binned['p'] > 0].reset_index(drop=True)
+
+
+def main():
+    from_env()
+    graph = SignedGraph.load('bitcoinotc.csv')
+    nets = {'G': graph, 'L+': graph.positive(), 'L-': graph.negative()}
+
+    for direction in ['in', 'out']:
+        dists = {name: Distribution.distributions(net.degree_frame(direction)) for name, net in nets.items()}
+        print(f'{direction}-degree')
+        print(fit_table(dists).to_string())
+
+
+if __name__ == '__main__':
+    main()
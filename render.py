@@ -0,0 +1,293 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import all_nets
+import instrument
+import bitcoin_otc
+import neg_net
+import pos_net
+from assortativity import assortativity_over_time
+from distro import Distribution
+from ingest import dataset_hash, load_ratings
+from plotting import headless, plt
+from result_cache import ResultCache
+from signed_graph import SignedGraph
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Figure Rendering
+-------------------------------------------
+Regenerates the figures/ set without any
+interactive windows. Figures are drawn on
+the Agg backend with mathtext, spread over
+a process pool, and skipped when neither the
+data nor the plotting code has changed.
+
+    python render.py
+    python render.py --force top10.png growth.png
+    python render.py --force --trace trace.json --profile stacks.txt
+'''
+
+RENDER_VERSION = 1
+MANIFEST = '.render_manifest.json'
+
+# Code whose changes should re-render every figure
+CORE_SOURCES = ['distro.py', 'clustering.py', 'approx_clustering.py', 'signed_graph.py', 'ingest.py',
+                'user_index.py', 'plotting.py', 'result_cache.py', 'render.py', 'assortativity.py',
+                'instrument.py', 'lazy.py']
+
+# Output file -> (plot function, keyword arguments given as input names)
+FIGURES = {
+    'degree_dist.png': (bitcoin_otc.plot_pdf, {'in_degree_dist': 'G_in', 'out_degree_dist': 'G_out'}),
+    'ccdf_g.png': (bitcoin_otc.plot_ccdf, {'in_degree_dist': 'G_in', 'out_degree_dist': 'G_out'}),
+    'L+_degree.png': (pos_net.plot_pdf, {'in_degree_dist': 'L+_in', 'out_degree_dist': 'L+_out'}),
+    'ccdf_l_plus.png': (pos_net.plot_ccdf, {'in_degree_dist': 'L+_in', 'out_degree_dist': 'L+_out'}),
+    'L-_degree.png': (neg_net.plot_pdf, {'in_degree_dist': 'L-_in', 'out_degree_dist': 'L-_out'}),
+    'ccdf_l_min.png': (neg_net.plot_ccdf, {'in_degree_dist': 'L-_in', 'out_degree_dist': 'L-_out'}),
+    'c(k)_g.png': (bitcoin_otc.CC_vs_degree, {'cc': 'G_ccdegree'}),
+    'c(k)_l_plus.png': (pos_net.CC_vs_degree, {'cc': 'L+_ccdegree'}),
+    'c(k)_l_minus.png': (neg_net.CC_vs_degree, {'cc': 'L-_ccdegree'}),
+    'cc_dist.png': (bitcoin_otc.cc_distribution, {'cc': 'G_cc'}),
+    'pref_attach.png': (all_nets.plot_pref_attach, {'pref': ['G_pref', 'L+_pref', 'L-_pref']}),
+    'top10.png': (bitcoin_otc.plot_top10, {'df': 'df', 'table': 'ratings'}),
+    'lowest_rated.png': (bitcoin_otc.plot_lowest10, {'df': 'df', 'table': 'ratings'}),
+    'top5_in.png': (bitcoin_otc.plot_in_k_users, {'df': 'df'}),
+    'top5_out.png': (bitcoin_otc.plot_out_k_users, {'df': 'df'}),
+    'growth.png': (bitcoin_otc.network_vs_time, {'df': 'df'}),
+    'assort_g.png': (bitcoin_otc.plot_assortativity, {'assort': 'assort'}),
+}
+
+# Network name -> rating filter used in result cache keys
+FILTERS = {'G': 'all', 'L+': 'positive', 'L-': 'negative'}
+
+
+class Inputs:
+
+    def __init__(self, path, cache_dir=None):
+        self.path = path
+        self.values = {}
+
+        # Metric results are reused across runs unless caching is off
+        here = os.path.dirname(os.path.abspath(__file__))
+        sources = [os.path.join(here, source) for source in CORE_SOURCES]
+        self.cache = ResultCache(cache_dir, sources=sources) if cache_dir else None
+        self.data_hash = dataset_hash(path) if cache_dir else None
+
+    # Compute an input on first request and keep it for later figures
+    def get(self, key):
+        if isinstance(key, list):
+            return [self.get(k) for k in key]
+
+        if key not in self.values:
+            self.values[key] = self.compute(key)
+        return self.values[key]
+
+    # Run a metric through the result cache when there is one
+    def metric(self, func, filter, variant, args):
+        if self.cache is None:
+            return func(*args())
+        return self.cache.call(func, self.data_hash, filter, variant, args)
+
+    # Ratings of one network, L+ and L- keep their sign only
+    def frame(self, name):
+        df = self.get('df')
+        if name == 'G':
+            return df
+        return df[df['RATING'] > 0] if name == 'L+' else df[df['RATING'] < 0]
+
+    def compute(self, key):
+        with instrument.span('input', key=key):
+            return self.build(key)
+
+    def build(self, key):
+        if key == 'df':
+            return load_ratings(self.path)
+        if key == 'graph':
+            return SignedGraph.from_frame(self.get('df'))
+        if key == 'ratings':
+            return self.metric(Distribution.rating_table, 'all', '', lambda: (self.get('df'),))
+        if key == 'assort':
+            return self.metric(assortativity_over_time, 'all', '', lambda: (self.get('df'),))
+
+        # Network views, e.g. 'L+_in' or 'G_nx'
+        name, what = key.split('_')
+        filter = FILTERS[name]
+        graph = self.get('graph')
+        net = {'G': graph, 'L+': graph.positive(), 'L-': graph.negative()}[name]
+
+        if what == 'nx':
+            return net.to_networkx()
+        if what == 'ccdegree':
+            return self.metric(Distribution.cc_by_degree, filter, '', lambda: (self.get(f'{name}_nx'),))
+        if what == 'cc':
+            return self.metric(SignedGraph.clustering, filter, '', lambda: (net,))['CC']
+        if what == 'pref':
+            return self.metric(Distribution.pref_attach_temporal, filter, '', lambda: (self.frame(name),))
+
+        return self.metric(Distribution.distributions, filter, what, lambda: (net.degree_frame(what),))
+
+
+# Input names of a figure
+def input_keys(name):
+    _, kwargs = FIGURES[name]
+    return [k for key in kwargs.values() for k in (key if isinstance(key, list) else [key])]
+
+
+# Inputs that more than one of the figures needs, after the frame and the
+# graph every network view is built from
+def shared_keys(names):
+    uses = Counter(key for name in names for key in input_keys(name))
+    return ['df', 'graph'] + [key for key, n in uses.items() if n > 1 and key not in ('df', 'graph')]
+
+
+# Inputs of a process by data file and cache. The parent fills in the
+# shared ones before the pool starts, so forked workers inherit them and
+# only build what their own figures need
+_inputs = {}
+
+
+# Workers that are not forked get the parent's shared inputs through this
+def init_worker(data_path, cache_dir, inputs):
+    _inputs[data_path, cache_dir] = inputs
+
+
+# Process pool whose workers start with the shared inputs, forked where the
+# platform can, else sent to each worker once by its initializer
+def worker_pool(workers, data_path, cache_dir):
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                               initargs=(data_path, cache_dir, _inputs[data_path, cache_dir]))
+
+
+def render_one(name, data_path, out_dir, cache_dir=None, trace=False):
+    # Workers that were not forked from a traced parent turn tracing on here
+    if trace:
+        instrument.enable(memory=False)
+
+    if (data_path, cache_dir) not in _inputs:
+        _inputs[data_path, cache_dir] = Inputs(data_path, cache_dir)
+    inputs = _inputs[data_path, cache_dir]
+
+    # No windows, and mathtext only, never spawn LaTeX
+    headless()
+    plt.rcParams['text.usetex'] = False
+
+    start = time.perf_counter()
+    plot, kwargs = FIGURES[name]
+    with instrument.span('render', figure=name):
+        plot(path=os.path.join(out_dir, name), **{arg: inputs.get(key) for arg, key in kwargs.items()})
+
+    # Spans recorded in the worker go back to the parent's trace
+    return name, time.perf_counter() - start, instrument.drain()
+
+
+# Hash of the data and of the code that draws a figure
+def fingerprint(name, data_hash):
+    plot, _ = FIGURES[name]
+    digest = hashlib.sha256(f'{RENDER_VERSION}:{name}:{data_hash}'.encode())
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    for source in CORE_SOURCES + [plot.__module__ + '.py']:
+        with open(os.path.join(here, source), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(out_dir, manifest):
+    with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+# Names that are not figures render.py knows how to draw
+def unknown_figures(names):
+    return [name for name in names if name not in FIGURES]
+
+
+# Render the named figures (all by default), returns name -> seconds
+def render(names=None, data_path='bitcoinotc.csv', out_dir='figures', workers=None, force=False,
+           cache_dir='.result_cache'):
+    names = list(FIGURES) if not names else names
+    unknown = unknown_figures(names)
+    if unknown:
+        raise ValueError(f'unknown figures {unknown}, expected any of {sorted(FIGURES)}')
+    os.makedirs(out_dir, exist_ok=True)
+
+    data_hash = dataset_hash(data_path)
+    manifest = read_manifest(out_dir)
+    prints = {name: fingerprint(name, data_hash) for name in names}
+
+    stale = [name for name in names
+             if force or manifest.get(name) != prints[name]
+             or not os.path.exists(os.path.join(out_dir, name))]
+
+    timings = {}
+    if stale:
+        inputs = _inputs[data_path, cache_dir] = Inputs(data_path, cache_dir)
+        for key in shared_keys(stale):
+            inputs.get(key)
+
+        with worker_pool(workers, data_path, cache_dir) as pool:
+            jobs = [pool.submit(render_one, name, data_path, out_dir, cache_dir, instrument.enabled())
+                    for name in stale]
+            for job in jobs:
+                name, seconds, events = job.result()
+                instrument.extend(events)
+                timings[name] = seconds
+                manifest[name] = prints[name]
+
+        write_manifest(out_dir, manifest)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('names', nargs='*', help=f'figures to render, any of {sorted(FIGURES)}')
+    parser.add_argument('--data', default='bitcoinotc.csv')
+    parser.add_argument('--out', default='figures')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='render even if nothing changed')
+    parser.add_argument('--cache-dir', default='.result_cache', help="metric result cache, '' to disable")
+    parser.add_argument('--trace', help='write a Chrome trace of the run to this file')
+    parser.add_argument('--profile', help='profile the parent process, .prof for cProfile, else sampled stacks')
+    args = parser.parse_args()
+
+    unknown = unknown_figures(args.names)
+    if unknown:
+        parser.error(f'unknown figures {unknown}, expected any of {sorted(FIGURES)}')
+
+    if args.trace or args.profile:
+        instrument.enable(trace=args.trace, profile=args.profile)
+    else:
+        instrument.from_env()
+
+    timings = render(args.names, args.data, args.out, args.workers, args.force, args.cache_dir)
+    for name, seconds in timings.items():
+        print(f'{name:20s} {seconds:6.2f}s')
+    print(f'rendered {len(timings)}, skipped {len(args.names or FIGURES) - len(timings)}')
+
+    if instrument.enabled():
+        print(instrument.summary().to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import argparse
+
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+from ingest import MAX_RATING
+from instrument import from_env, traced
+from signed_graph import SignedGraph
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Reputation
+-------------------------------------------
+Iterative reputation scores that look past
+summed ratings. Fairness and goodness (Kumar
+et al. 2016, the REV2 family): a user's
+goodness is the fairness weighted mean of
+the ratings they receive, and a rater's
+fairness drops the further their ratings sit
+from the goodness of the users they rate.
+Signed PageRank is PageRank over positive
+ratings minus PageRank over negative ones,
+so trust has to flow in from trusted users.
+
+Both iterate with sparse products until the
+largest change is below a tolerance, and
+both can start from a previous run's scores,
+so re-scoring after new ratings only needs
+a few iterations.
+
+    python reputation.py bitcoinotc.csv --out scores.csv
+    python reputation.py bitcoinotc.csv --previous scores.csv --out scores.csv
+'''
+
+
+# Dense source, target and rating/10 in [-1, 1] of every edge of the graph
+def rating_edges(graph):
+    pos = graph.edge_positions()
+    weight = graph.rating[pos].astype(np.float64) / MAX_RATING
+    return graph.sources()[pos], graph.indices[pos].astype(np.int64), weight
+
+
+# Previous scores aligned to the nodes of the graph, default for new nodes
+def warm_start(graph, previous, column, default):
+    x = np.full(len(graph.nodes), default, dtype=np.float64)
+    if previous is None:
+        return x
+
+    previous = previous.set_index('node')[column] if 'node' in previous else previous[column]
+
+    # A node listed twice keeps its last score, reindex needs unique labels
+    previous = previous[~previous.index.duplicated(keep='last')]
+    known = previous.reindex(graph.nodes)
+    x[known.notna().to_numpy()] = known.dropna().to_numpy()
+    return x
+
+
+# Fairness of every rater and goodness of every rated user. Returns the
+# scores of the nodes in the graph and the number of iterations used.
+# Users nobody rated have no goodness (NaN) rather than the starting 1.0
+@traced
+def fairness_goodness(graph, tol=1e-6, max_iter=100, previous=None):
+    n = len(graph.nodes)
+    source, target, weight = rating_edges(graph)
+
+    out_count = np.bincount(source, minlength=n)
+    in_count = np.bincount(target, minlength=n)
+
+    # Rated by f: W.T @ f sums fairness weighted ratings per target
+    W = sp.csr_matrix((weight, (source, target)), shape=(n, n))
+    WT = W.T.tocsr()
+
+    fairness = warm_start(graph, previous, 'fairness', 1.0)
+    goodness = warm_start(graph, previous, 'goodness', 1.0)
+
+    for iteration in range(1, max_iter + 1):
+        new_goodness = np.divide(WT @ fairness, in_count, out=goodness.copy(), where=in_count > 0)
+
+        # Mean distance of a rater's ratings from the goodness of those rated,
+        # halved since ratings and goodness both lie in [-1, 1]
+        error = np.bincount(source, weights=np.abs(weight - new_goodness[target]), minlength=n)
+        new_fairness = 1 - np.divide(error, 2 * out_count, out=np.zeros(n), where=out_count > 0)
+        new_fairness[out_count == 0] = fairness[out_count == 0]
+
+        change = max(np.abs(new_fairness - fairness).max(initial=0), np.abs(new_goodness - goodness).max(initial=0))
+        fairness, goodness = new_fairness, new_goodness
+        if change < tol:
+            break
+
+    goodness[in_count == 0] = np.nan
+
+    present = graph.node_mask()
+    scores = pd.DataFrame({'node': graph.nodes[present],
+                           'fairness': fairness[present],
+                           'goodness': goodness[present]})
+    return scores, iteration
+
+
+# PageRank by power iteration over a row-normalised transition matrix P.
+# Rows without out-edges (dangling nodes) jump uniformly
+def pagerank(P, alpha=0.85, tol=1e-10, max_iter=200, x0=None):
+    n = P.shape[0]
+    dangling = np.asarray(P.sum(axis=1)).ravel() == 0
+    PT = P.T.tocsr()
+
+    x = np.full(n, 1 / n) if x0 is None else x0 / x0.sum()
+
+    for iteration in range(1, max_iter + 1):
+        new = alpha * (PT @ x + x[dangling].sum() / n) + (1 - alpha) / n
+        change = np.abs(new - x).sum()
+        x = new
+        if change < tol:
+            break
+
+    return x, iteration
+
+
+# Transition matrix of the edges selected by mask, weighted by |rating|
+def transitions(n, source, target, weight, mask):
+    W = sp.csr_matrix((np.abs(weight[mask]), (source[mask], target[mask])), shape=(n, n))
+    row_sum = np.asarray(W.sum(axis=1)).ravel()
+    scale = np.divide(1, row_sum, out=np.zeros(n), where=row_sum > 0)
+    return sp.diags(scale) @ W
+
+
+# PageRank over L+ minus PageRank over L-. Returns the scores of the nodes
+# in the graph and the iterations of the slower of the two solves. Users
+# nobody rated only hold teleport and dangling mass, so their signed score
+# is NaN
+@traced
+def signed_pagerank(graph, alpha=0.85, tol=1e-10, max_iter=200, previous=None):
+    n = len(graph.nodes)
+    source, target, weight = rating_edges(graph)
+
+    ranks, iterations = {}, []
+    for name, mask in (('pagerank_pos', weight > 0), ('pagerank_neg', weight < 0)):
+        x0 = warm_start(graph, previous, name, 1 / n) if previous is not None else None
+        ranks[name], used = pagerank(transitions(n, source, target, weight, mask), alpha, tol, max_iter, x0)
+        iterations.append(used)
+
+    present = graph.node_mask()
+    scores = pd.DataFrame({'node': graph.nodes[present],
+                           'pagerank_pos': ranks['pagerank_pos'][present],
+                           'pagerank_neg': ranks['pagerank_neg'][present]})
+    rated = np.bincount(target, minlength=n)[present] > 0
+    scores['signed_pagerank'] = (scores['pagerank_pos'] - scores['pagerank_neg']).where(rated)
+    return scores, max(iterations)
+
+
+# Every reputation score of every node, warm started from previous when given
+def reputation(graph, previous=None, tol=1e-6):
+    fg, fg_iterations = fairness_goodness(graph, tol=tol, previous=previous)
+    pr, pr_iterations = signed_pagerank(graph, tol=tol * 1e-4, previous=previous)
+    return fg.merge(pr, on='node'), {'fairness_goodness': fg_iterations, 'signed_pagerank': pr_iterations}
+
+
+# The k highest scored users by column, skipping users without a score
+def top(scores, column, k=10):
+    return scores.dropna(subset=[column]).nlargest(k, column)
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='bitcoinotc.csv')
+    parser.add_argument('--previous', help='scores csv of an earlier run to warm start from')
+    parser.add_argument('--out', help='write the scores to this csv')
+    parser.add_argument('--tol', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    previous = pd.read_csv(args.previous) if args.previous else None
+    scores, iterations = reputation(SignedGraph.load(args.path), previous, args.tol)
+
+    print(f'iterations {iterations}')
+    for column in ('goodness', 'signed_pagerank'):
+        print(top(scores, column).to_string(index=False))
+
+    if args.out:
+        scores.to_csv(args.out, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+
+import pandas as pd
+import numpy as np
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Result Cache
+-------------------------------------------
+Persistent cache for Distribution results
+and graph metrics. A result is keyed by the
+dataset hash, the rating filter (all,
+positive, negative), the source code of the
+function that made it and an optional
+variant. The source is the whole module the
+function is defined in, together with any
+other source files the cache is given, so
+editing a helper invalidates results too.
+Results are stored as .npz files and the
+least recently used ones are removed once
+the cache grows past its size limit.
+'''
+
+CACHE_VERSION = 2
+MISSING = object()
+
+
+# Source of the module a function is defined in, so editing it or any
+# helper next to it invalidates its results
+def function_version(func):
+    try:
+        with open(inspect.getsourcefile(inspect.unwrap(func)), 'rb') as f:
+            source = f.read()
+    except (OSError, TypeError):
+        source = getattr(func, '__qualname__', repr(func)).encode()
+    return hashlib.sha256(source).hexdigest()
+
+
+# Hash of the contents of some source files, missing files count as empty
+def sources_version(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode() + b'\x00')
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            pass
+    return digest.hexdigest()
+
+
+# Flatten a result into named arrays and a JSON description of its shape
+def encode(value, arrays, prefix='v'):
+    if isinstance(value, pd.DataFrame):
+        arrays[f'{prefix}.index'] = storable(value.index.to_numpy())
+        for i, column in enumerate(value.columns):
+            arrays[f'{prefix}.{i}'] = storable(value[column].to_numpy())
+        return {'type': 'frame', 'columns': list(value.columns), 'index_name': value.index.name}
+
+    if isinstance(value, pd.Series):
+        arrays[f'{prefix}.index'] = storable(value.index.to_numpy())
+        arrays[f'{prefix}.values'] = storable(value.to_numpy())
+        return {'type': 'series', 'name': value.name, 'index_name': value.index.name}
+
+    if isinstance(value, np.ndarray):
+        arrays[prefix] = storable(value)
+        return {'type': 'array'}
+
+    if isinstance(value, (tuple, list)):
+        items = [encode(item, arrays, f'{prefix}.{i}') for i, item in enumerate(value)]
+        return {'type': type(value).__name__, 'items': items}
+
+    if isinstance(value, (int, float, str, bool, np.integer, np.floating)) or value is None:
+        return {'type': 'scalar', 'value': value.item() if isinstance(value, np.generic) else value}
+
+    raise TypeError(f'cannot cache values of type {type(value).__name__}')
+
+
+def decode(spec, arrays, prefix='v'):
+    kind = spec['type']
+
+    if kind == 'frame':
+        columns = {c: arrays[f'{prefix}.{i}'] for i, c in enumerate(spec['columns'])}
+        index = pd.Index(arrays[f'{prefix}.index'], name=spec['index_name'])
+        return pd.DataFrame(columns, index=index, columns=spec['columns'])
+
+    if kind == 'series':
+        index = pd.Index(arrays[f'{prefix}.index'], name=spec['index_name'])
+        return pd.Series(arrays[f'{prefix}.values'], index=index, name=spec['name'])
+
+    if kind == 'array':
+        return arrays[prefix]
+
+    if kind in ('tuple', 'list'):
+        items = [decode(item, arrays, f'{prefix}.{i}') for i, item in enumerate(spec['items'])]
+        return tuple(items) if kind == 'tuple' else items
+
+    return spec['value']
+
+
+# Object arrays would need pickle to load, store them as strings instead
+def storable(values):
+    if values.dtype == object:
+        return values.astype(str)
+    return values
+
+
+class ResultCache:
+
+    # sources are files every result depends on, such as the modules the
+    # cached functions call into
+    def __init__(self, directory='.result_cache', max_bytes=1 << 30, sources=()):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sources = sources_version(sources)
+        os.makedirs(directory, exist_ok=True)
+
+    # Content address of a result
+    def key(self, func, dataset, filter='all', variant=''):
+        name = getattr(func, '__qualname__', str(func))
+        parts = [str(CACHE_VERSION), dataset, filter, name, function_version(func), self.sources, str(variant)]
+        return hashlib.sha256('\x00'.join(parts).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    # Stored result, or MISSING. A hit marks the entry as recently used
+    def get(self, key):
+        path = self.path(key)
+
+        # Another process may evict the entry at any time, and an entry that
+        # cannot be read back is dropped and recomputed
+        try:
+            with np.load(path) as stored:
+                arrays = {name: stored[name] for name in stored.files}
+            value = decode(json.loads(str(arrays.pop('spec'))), arrays)
+            os.utime(path)
+        except FileNotFoundError:
+            return MISSING
+        except Exception:
+            self.discard(path)
+            return MISSING
+
+        return value
+
+    def put(self, key, value):
+        arrays = {}
+        spec = encode(value, arrays)
+
+        # Each writer has its own temporary file. Concurrent writers of a key
+        # store the same result, so losing the replace to another is a hit
+        path = self.path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f'{key}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, spec=np.array(json.dumps(spec)), **arrays)
+            os.replace(tmp, path)
+        except BaseException as error:
+            self.discard(tmp)
+            if not isinstance(error, OSError) or not os.path.exists(path):
+                raise
+
+        self.evict()
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    # Remove the least recently used entries until the cache fits its limit
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.discard(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(('.npz', '.tmp')):
+                self.discard(os.path.join(self.directory, name))
+
+    # Result of func(*args()), computed only on a cache miss. args is a
+    # callable so that expensive inputs such as graphs are only built when needed
+    def call(self, func, dataset, filter='all', variant='', args=tuple):
+        key = self.key(func, dataset, filter, variant)
+
+        value = self.get(key)
+        if value is MISSING:
+            value = func(*args())
+            self.put(key, value)
+        return value
+
+    # func wrapped so every call goes through the cache, extra positional
+    # arguments are not hashed so calls that differ should pass a variant
+    def wrap(self, func, dataset, filter='all'):
+        def cached(*args, variant=''):
+            return self.call(func, dataset, filter, variant, lambda: args)
+        return cached
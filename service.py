@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from distro import Distribution
+from ingest import load_ratings
+from instrument import from_env, span, traced
+from signed_graph import SignedGraph
+from user_index import UserIndex
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Query Service
+-------------------------------------------
+Long running HTTP service for per-user
+lookups. The ratings are loaded once and the
+rating table, the in and out degrees of G,
+L+ and L- and a UserIndex are precomputed,
+so a query is a few binary searches. Encoded
+responses are kept in an LRU cache.
+
+    GET  /user/<id>                 aggregates, degrees and k(t)
+    GET  /users?ids=1,2,3&series=0  many users at once
+    POST /users  {"ids": [1, 2, 3]}
+    GET  /stats                     cache and load statistics
+
+Aggregates match Distribution.rating_table
+and overall_ratings, degrees match
+SignedGraph.degree_frame and the series
+match Distribution.k_vs_t.
+
+    python service.py bitcoinotc.csv --port 8021
+'''
+
+NETWORKS = {'G': lambda graph: graph, 'L+': SignedGraph.positive, 'L-': SignedGraph.negative}
+AGGREGATES = ['in_count', 'out_count', 'pos_in', 'neg_in', 'pos_out', 'neg_out',
+              'overall_rating', 'pos_rating', 'neg_rating']
+MAX_BULK = 10000
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+
+class QueryError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Least recently used responses, keyed by the request target
+class ResponseCache:
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        body = self.entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        self.entries[key] = body
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+class UserStore:
+
+    # Every per-user answer precomputed as arrays over the sorted node ids
+    @traced(name='UserStore')
+    def __init__(self, df):
+        table = Distribution.rating_table(df)
+        self.nodes = table['node'].to_numpy()
+        self.aggregates = {c: table[c].to_numpy() for c in AGGREGATES}
+        self.mean_rating = table['mean_rating'].to_numpy()
+
+        # SignedGraph dense ids are the same sorted node ids
+        graph = SignedGraph.from_frame(df)
+        self.degrees = {}
+        for name, view in NETWORKS.items():
+            net = view(graph)
+            self.degrees[name] = {'in': net.in_degree(), 'out': net.out_degree()}
+
+        with span('user_index'):
+            self.index = UserIndex(df)
+
+    # Dense id of a user, KeyError for users that never rated or were rated
+    def position(self, user):
+        i = np.searchsorted(self.nodes, user)
+        if i == len(self.nodes) or self.nodes[i] != user:
+            raise KeyError(user)
+        return i
+
+    # Times and cumulative degree as Distribution.k_vs_t, t_in and k_in are
+    # the ratings the user made
+    def series(self, user):
+        t_in, t_out, k_in, k_out = self.index.k_vs_t(user)
+        as_text = lambda t: np.datetime_as_string(t, unit='auto').tolist()
+        return {'in': {'TIME': as_text(t_in), 'k': k_in.tolist()},
+                'out': {'TIME': as_text(t_out), 'k': k_out.tolist()}}
+
+    # JSON ready answer for one user
+    def lookup(self, user, series=True):
+        i = self.position(user)
+        result = {'user': int(user)}
+        result.update({c: values[i].item() for c, values in self.aggregates.items()})
+
+        # overall_ratings only lists users that were rated
+        if result['in_count'] == 0:
+            result['overall_rating'] = None
+        result['mean_rating'] = None if np.isnan(self.mean_rating[i]) else float(self.mean_rating[i])
+
+        result['degree'] = {name: {d: int(degree[d][i]) for d in ('in', 'out')}
+                            for name, degree in self.degrees.items()}
+        if series:
+            result['k_vs_t'] = self.series(user)
+        return result
+
+    # Answers for many users, unknown ones are listed separately
+    def lookup_many(self, users, series=False):
+        found, missing = [], []
+        for user in users:
+            try:
+                found.append(self.lookup(user, series))
+            except KeyError:
+                missing.append(int(user))
+        return {'users': found, 'missing': missing}
+
+
+# User id from a path or query string, or from JSON where only integers
+# are ids (not floats such as 1e30, booleans or strings)
+def parse_user(text):
+    if isinstance(text, bool) or not isinstance(text, (str, int)):
+        raise QueryError(400, f'bad user id {text!r}')
+    try:
+        return int(text)
+    except ValueError:
+        raise QueryError(400, f'bad user id {text!r}')
+
+
+def parse_flag(query, name, default):
+    values = query.get(name)
+    if not values:
+        return default
+    return values[-1].lower() not in ('0', 'false', 'no')
+
+
+def parse_ids(ids):
+    if not isinstance(ids, list):
+        raise QueryError(400, 'ids must be a list')
+    if len(ids) > MAX_BULK:
+        raise QueryError(400, f'at most {MAX_BULK} ids per request')
+    return [parse_user(user) for user in ids]
+
+
+async def respond(writer, status, payload, keep_alive):
+    writer.write((f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                  'Content-Type: application/json\r\n'
+                  f'Content-Length: {len(payload)}\r\n'
+                  f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n').encode()
+                 + payload)
+    await writer.drain()
+
+
+class QueryService:
+
+    def __init__(self, store, cache_size=4096):
+        self.store = store
+        self.cache = ResponseCache(cache_size)
+        self.started = time.time()
+        self.requests = 0
+
+    # Status and JSON body of a request, GET lookups are cached
+    def handle(self, method, target, body=b''):
+        self.requests += 1
+        cacheable = method == 'GET' and not target.startswith('/stats')
+        if cacheable:
+            cached = self.cache.get(target)
+            if cached is not None:
+                return 200, cached
+
+        try:
+            status, result = 200, self.route(method, target, body)
+        except QueryError as e:
+            status, result = e.status, {'error': str(e)}
+        except Exception as e:
+            status, result = 500, {'error': f'{type(e).__name__}: {e}'}
+
+        encoded = json.dumps(result, separators=(',', ':')).encode()
+        if cacheable and status == 200:
+            self.cache.put(target, encoded)
+        return status, encoded
+
+    def route(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [p for p in url.path.split('/') if p]
+
+        if method == 'GET' and len(parts) == 2 and parts[0] == 'user':
+            try:
+                return self.store.lookup(parse_user(parts[1]), parse_flag(query, 'series', True))
+            except KeyError:
+                raise QueryError(404, f'unknown user {parts[1]}')
+
+        if parts == ['users']:
+            series = parse_flag(query, 'series', False)
+            if method == 'GET':
+                ids = [user for value in query.get('ids', []) for user in value.split(',') if user]
+                return self.store.lookup_many(parse_ids(ids), series)
+            if method == 'POST':
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    raise QueryError(400, 'body must be JSON')
+                ids = payload.get('ids', []) if isinstance(payload, dict) else payload
+                return self.store.lookup_many(parse_ids(ids), series)
+
+        if method == 'GET' and parts == ['stats']:
+            return {'users': len(self.store.nodes), 'requests': self.requests,
+                    'cache_entries': len(self.cache.entries), 'cache_hits': self.cache.hits,
+                    'cache_misses': self.cache.misses, 'uptime_s': time.time() - self.started}
+
+        raise QueryError(404, f'no route for {method} {url.path}')
+
+    # One connection, requests are answered in turn while it is kept alive
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (headers.get('connection', '').lower() != 'close' and
+                              version != 'HTTP/1.0')
+
+                # A body of unknown length cannot be skipped, so the
+                # connection is closed after the error
+                length = headers.get('content-length', '0')
+                if length.isdigit():
+                    body = await reader.readexactly(int(length)) if int(length) else b''
+                    status, payload = self.handle(method, target, body)
+                else:
+                    status, payload = 400, json.dumps({'error': f'bad Content-Length {length!r}'}).encode()
+                    keep_alive = False
+
+                await respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            # Requests the reader cannot take, such as a line over its limit.
+            # Errors while answering are already 500s from handle()
+            try:
+                await respond(writer, 400, json.dumps({'error': f'bad request: {e}'}).encode(), False)
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8021):
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='bitcoinotc.csv')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8021)
+    parser.add_argument('--cache-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = UserStore(load_ratings(args.path))
+    print(f'{len(store.nodes)} users ready in {time.perf_counter() - start:.2f}s, '
+          f'serving on http://{args.host}:{args.port}', flush=True)
+
+    try:
+        asyncio.run(QueryService(store, args.cache_size).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+import pandas as pd
+import numpy as np
+
+import clustering
+from ingest import build_graph, load_arrays
+from instrument import traced
+from lazy import lazy_import
+
+sp = lazy_import('scipy.sparse')
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Signed Graph
+-------------------------------------------
+Directed rating graph stored as CSR (out
+edges) and CSC (in edges) arrays over dense
+node ids, with an int8 rating per edge.
+L+ and L- are boolean masks over the same
+edge arrays rather than separate graphs.
+'''
+
+
+class SignedGraph:
+
+    # Edges given by original node ids, or by dense ids into nodes when
+    # nodes is given (e.g. from ingest.Ratings)
+    @traced(name='SignedGraph')
+    def __init__(self, source, target, rating, nodes=None):
+        source = np.asarray(source)
+        target = np.asarray(target)
+        rating = np.asarray(rating)
+
+        if len(rating) and (rating.min() < -128 or rating.max() > 127):
+            raise ValueError('ratings must fit in int8')
+
+        # Dense ids, self.nodes maps them back to the original node ids
+        if nodes is None:
+            self.nodes, inverse = np.unique(np.concatenate([source, target]), return_inverse=True)
+            src = inverse[:len(source)].astype(np.int64)
+            dst = inverse[len(source):].astype(np.int64)
+        else:
+            self.nodes = np.asarray(nodes)
+            src = source.astype(np.int64)
+            dst = target.astype(np.int64)
+        n = len(self.nodes)
+
+        # One edge per (source, target, sign), the last rating wins as in nx.DiGraph.
+        # L+ and L- are built from separately filtered frames, so a pair rated
+        # both ways keeps its last positive and its last negative rating
+        sign = np.sign(rating).astype(np.int64) + 1
+        key = (src * n + dst) * 3 + sign
+        del sign
+        _, last = np.unique(key[::-1], return_index=True)
+        keep = len(key) - 1 - last
+        del key, last
+        src, dst = src[keep], dst[keep]
+
+        # CSR, edges ordered by (source, target)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))])
+        self.indices = dst.astype(np.int32)
+        self.rating = rating[keep].astype(np.int8)
+
+        # CSC, in_edge gives the CSR position of every in edge
+        self.in_edge = np.lexsort((src, dst))
+        self.in_indptr = np.concatenate([[0], np.cumsum(np.bincount(dst, minlength=n))])
+        self.in_indices = src[self.in_edge].astype(np.int32)
+
+        # The full graph only keeps the latest edge of a pair rated both ways
+        pair = src * n + dst
+        order = np.lexsort((keep, pair))
+        is_last = np.ones(len(pair), dtype=bool)
+        is_last[:-1] = pair[order][1:] != pair[order][:-1]
+        latest = np.zeros(len(pair), dtype=bool)
+        latest[order[is_last]] = True
+
+        self.mask = None if latest.all() else latest
+        self._nx = None
+
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df['SOURCE'].to_numpy(), df['TARGET'].to_numpy(), df['RATING'].to_numpy())
+
+
+    # Build from compact ratings, reusing their dense ids. With a mask the
+    # ids are renumbered over the users left, so no node is without edges
+    @classmethod
+    def from_ratings(cls, ratings, mask=None):
+        source, target, rating, _ = ratings.select(mask)
+        if mask is None:
+            return cls(source, target, rating, nodes=ratings.nodes)
+
+        present = np.zeros(len(ratings.nodes), dtype=bool)
+        present[source] = True
+        present[target] = True
+        used = np.flatnonzero(present)
+
+        renumber = np.zeros(len(ratings.nodes), dtype=np.int64)
+        renumber[used] = np.arange(len(used))
+        return cls(renumber[source], renumber[target], rating, nodes=ratings.nodes[used])
+
+
+    # Build straight from the cached edge arrays of a rating file
+    @classmethod
+    def load(cls, path='bitcoinotc.csv'):
+        columns = load_arrays(path)
+        return cls(columns['SOURCE'], columns['TARGET'], columns['RATING'])
+
+
+    # View of the same arrays restricted to the edges where mask is True
+    def view(self, mask):
+        sub = object.__new__(SignedGraph)
+        sub.__dict__.update(self.__dict__)
+        sub.mask = mask
+        sub._nx = None
+        return sub
+
+    # L+, positive ratings only
+    def positive(self):
+        return self.view(self.rating > 0)
+
+    # L-, negative ratings only
+    def negative(self):
+        return self.view(self.rating < 0)
+
+
+    def num_nodes(self):
+        return int(self.node_mask().sum())
+
+    def num_edges(self):
+        return len(self.indices) if self.mask is None else int(self.mask.sum())
+
+    # CSR positions of the edges in the graph
+    def edge_positions(self):
+        if self.mask is None:
+            return np.arange(len(self.indices))
+        return np.flatnonzero(self.mask)
+
+    # Source dense id of every CSR edge
+    def sources(self):
+        return np.repeat(np.arange(len(self.nodes)), np.diff(self.indptr))
+
+
+    def out_degree(self):
+        if self.mask is None:
+            return np.diff(self.indptr)
+
+        counts = np.concatenate([[0], np.cumsum(self.mask)])
+        return counts[self.indptr[1:]] - counts[self.indptr[:-1]]
+
+    def in_degree(self):
+        if self.mask is None:
+            return np.diff(self.in_indptr)
+
+        counts = np.concatenate([[0], np.cumsum(self.mask[self.in_edge])])
+        return counts[self.in_indptr[1:]] - counts[self.in_indptr[:-1]]
+
+    # Nodes with at least one edge in the graph, L+ and L- only keep their own
+    def node_mask(self):
+        if self.mask is None:
+            return np.ones(len(self.nodes), dtype=bool)
+        return (self.in_degree() + self.out_degree()) > 0
+
+
+    # Dense id of an original node id
+    def dense_id(self, node):
+        i = np.searchsorted(self.nodes, node)
+        if i == len(self.nodes) or self.nodes[i] != node:
+            raise KeyError(node)
+        return i
+
+    # Nodes the given node rates, a slice of the CSR arrays for the full graph
+    def out_neighbors(self, node):
+        i = self.dense_id(node)
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        neighbors = self.indices[lo:hi]
+
+        if self.mask is not None:
+            neighbors = neighbors[self.mask[lo:hi]]
+        return self.nodes[neighbors]
+
+    # Nodes that rate the given node
+    def in_neighbors(self, node):
+        i = self.dense_id(node)
+        lo, hi = self.in_indptr[i], self.in_indptr[i + 1]
+        neighbors = self.in_indices[lo:hi]
+
+        if self.mask is not None:
+            neighbors = neighbors[self.mask[self.in_edge[lo:hi]]]
+        return self.nodes[neighbors]
+
+
+    # Same table as pd.DataFrame(net.in_degree/out_degree) sorted by node
+    def degree_frame(self, direction='in'):
+        degree = self.in_degree() if direction == 'in' else self.out_degree()
+        present = self.node_mask()
+
+        return pd.DataFrame({'node': self.nodes[present], 'degree': degree[present]})
+
+
+    # Binary CSR adjacency over all dense ids
+    def adjacency(self):
+        n = len(self.nodes)
+        if self.mask is None:
+            data = np.ones(len(self.indices))
+            return sp.csr_matrix((data, self.indices, self.indptr), shape=(n, n))
+
+        # Masking keeps the CSR order, so the row offsets are the masked out degrees
+        indptr = np.concatenate([[0], np.cumsum(self.out_degree())])
+        indices = self.indices[self.mask]
+        return sp.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(n, n))
+
+    # Directed clustering of every node, as nx.clustering on the DiGraph
+    @traced
+    def clustering(self):
+        cc = clustering.directed_clustering(self.adjacency())
+        present = self.node_mask()
+
+        return pd.DataFrame({'node': self.nodes[present], 'CC': cc[present]})
+
+
+    # SOURCE, TARGET, RATING frame of the edges in the graph
+    def edge_frame(self):
+        pos = self.edge_positions()
+        return pd.DataFrame({'SOURCE': self.nodes[self.sources()[pos]],
+                             'TARGET': self.nodes[self.indices[pos]],
+                             'RATING': self.rating[pos].astype(np.int64)})
+
+    # nx.DiGraph of the graph, built on first use and kept
+    @traced
+    def to_networkx(self):
+        if self._nx is None:
+            self._nx = build_graph(self.edge_frame())
+        return self._nx
@@ -0,0 +1,200 @@
+import argparse
+
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+import clustering
+from ingest import load_ratings
+from instrument import from_env, traced
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Temporal Snapshots
+-------------------------------------------
+Network statistics over sliding windows of
+the TIME sorted ratings. A window is the
+contiguous slice of ratings in [end -
+window, end) and windows move forward by
+stride. Between windows only the ratings
+that enter or expire are applied to the
+pair counts and degree arrays, so no graph
+is rebuilt. Component sizes and clustering
+are taken from the window's slice alone.
+
+Window and stride are pandas frequencies,
+e.g. '30D' and '7D', or 'MS' for calendar
+months.
+
+    python snapshots.py bitcoinotc.csv --window 30D --stride 30D
+'''
+
+
+class WindowState:
+
+    # Pair ids of every rating, in time order, and empty counts
+    def __init__(self, source, target):
+        nodes, inverse = np.unique(np.concatenate([source, target]), return_inverse=True)
+        self.nodes = nodes
+        self.n = n = len(nodes)
+        m = len(source)
+        self.source, self.target = inverse[:m], inverse[m:]
+
+        pairs, self.pair = np.unique(self.source * n + self.target, return_inverse=True)
+        self.pair_source, self.pair_target = pairs // n, pairs % n
+
+        self.pair_count = np.zeros(len(pairs), dtype=np.int64)
+        self.in_degree = np.zeros(n, dtype=np.int64)
+        self.out_degree = np.zeros(n, dtype=np.int64)
+        self.lo = self.hi = 0
+
+        # Scratch space for deduplicating without sorting
+        self.pair_slot = np.zeros(len(pairs), dtype=np.int64)
+        self.node_slot = np.zeros(n, dtype=np.int64)
+
+    # Move the window to the ratings [lo, hi), both bounds only move forward
+    def advance(self, lo, hi):
+        added = self.pair[self.hi:hi]
+        expired = self.pair[self.lo:lo]
+        self.lo, self.hi = lo, hi
+
+        # Distinct pairs touched, then their ratings in and out counted over
+        # positions 0..k-1 given by the same scratch slots
+        changed = np.concatenate([added, expired])
+        touched = distinct(changed, self.pair_slot)
+        self.pair_slot[touched] = np.arange(len(touched))
+        local = self.pair_slot[changed]
+        delta = (np.bincount(local[:len(added)], minlength=len(touched))
+                 - np.bincount(local[len(added):], minlength=len(touched)))
+
+        before = self.pair_count[touched] > 0
+        self.pair_count[touched] += delta
+        after = self.pair_count[touched] > 0
+
+        # A pair is an edge while it has at least one rating in the window
+        change = after.astype(np.int64) - before
+        moved = change != 0
+        np.add.at(self.out_degree, self.pair_source[touched[moved]], change[moved])
+        np.add.at(self.in_degree, self.pair_target[touched[moved]], change[moved])
+
+    def active(self):
+        return (self.in_degree + self.out_degree) > 0
+
+    # Source and target of the distinct pairs rated in the window, renumbered
+    # 0..k-1 over the k nodes they touch
+    def window_edges(self):
+        pairs = distinct(self.pair[self.lo:self.hi], self.pair_slot)
+        ends = np.concatenate([self.pair_source[pairs], self.pair_target[pairs]])
+
+        nodes = distinct(ends, self.node_slot)
+        self.node_slot[nodes] = np.arange(len(nodes))
+        local = self.node_slot[ends]
+        return local[:len(pairs)], local[len(pairs):], len(nodes)
+
+
+# Distinct values of an array in order of last appearance, slot is an
+# array indexed by value that is overwritten. Linear, unlike np.unique
+def distinct(values, slot):
+    position = np.arange(len(values))
+    slot[values] = position
+    return values[slot[values] == position]
+
+
+# Weak components of a window's edges, as (count, size of the largest)
+def components(source, target, n):
+    if len(source) == 0:
+        return 0, 0
+
+    A = sp.csr_matrix((np.ones(len(source)), (source, target)), shape=(n, n))
+    count, labels = connected_components(A, directed=True, connection='weak')
+    return count, int(np.bincount(labels).max())
+
+
+# Average undirected clustering of the nodes of a window
+def average_clustering(source, target, n):
+    if len(source) == 0:
+        return np.nan
+
+    A = clustering.edge_adjacency(source, target, n)
+    return float(clustering.undirected_clustering(clustering.symmetrize(A)).mean())
+
+
+# Window ends every stride, the first one a whole window after the first rating
+def window_ends(time, window, stride):
+    window, stride = pd.tseries.frequencies.to_offset(window), pd.tseries.frequencies.to_offset(stride)
+    first, last = pd.Timestamp(time[0]).normalize(), pd.Timestamp(time[-1])
+
+    ends = pd.date_range(first + window, last + stride, freq=stride)
+    return ends - window, ends
+
+
+# One row per window: ratings, edges, active nodes, degrees, weak components
+# and, when asked, average clustering. Also the in and out degree
+# distributions of every window in long form
+@traced
+def snapshots(df, window='30D', stride='30D', with_clustering=False):
+    df = df.sort_values('TIME', kind='stable')
+    time = df['TIME'].to_numpy()
+    positive = (df['RATING'].to_numpy() > 0)
+
+    state = WindowState(df['SOURCE'].to_numpy(), df['TARGET'].to_numpy())
+    starts, ends = window_ends(time, window, stride)
+    lo_all = np.searchsorted(time, starts.to_numpy(), side='left')
+    hi_all = np.searchsorted(time, ends.to_numpy(), side='left')
+
+    rows, dists = [], []
+    for start, end, lo, hi in zip(starts, ends, lo_all, hi_all):
+        state.advance(lo, hi)
+
+        active = state.active()
+        num_nodes = int(active.sum())
+        num_edges = int(state.out_degree.sum())
+
+        source, target, n = state.window_edges()
+        num_components, giant = components(source, target, n)
+
+        row = {'TIME': end, 'start': start, 'ratings': hi - lo,
+               'positive_share': positive[lo:hi].mean() if hi > lo else np.nan,
+               'edges': num_edges, 'nodes': num_nodes,
+               'mean_degree': num_edges / num_nodes if num_nodes else np.nan,
+               'max_in_degree': int(state.in_degree.max(initial=0)),
+               'max_out_degree': int(state.out_degree.max(initial=0)),
+               'components': num_components, 'giant_size': giant,
+               'giant_share': giant / num_nodes if num_nodes else np.nan}
+        if with_clustering:
+            row['avg_clustering'] = average_clustering(source, target, n)
+        rows.append(row)
+
+        for direction, degree in (('in', state.in_degree), ('out', state.out_degree)):
+            counts = np.bincount(degree[active])
+            k = np.flatnonzero(counts)
+            dists.append(pd.DataFrame({'TIME': end, 'direction': direction, 'k': k, 'n': counts[k]}))
+
+    table = pd.DataFrame(rows).set_index('TIME')
+    degree_dists = pd.concat(dists, ignore_index=True) if dists else pd.DataFrame(columns=['TIME', 'direction', 'k', 'n'])
+    return table, degree_dists
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='bitcoinotc.csv')
+    parser.add_argument('--window', default='30D')
+    parser.add_argument('--stride', default='30D')
+    parser.add_argument('--clustering', action='store_true')
+    parser.add_argument('--out', help='write the per window table to this csv')
+    args = parser.parse_args()
+
+    table, _ = snapshots(load_ratings(args.path), args.window, args.stride, args.clustering)
+    print(table.to_string())
+
+    if args.out:
+        table.to_csv(args.out)
+
+
+if __name__ == '__main__':
+    main()
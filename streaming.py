@@ -0,0 +1,137 @@
+import heapq
+
+import pandas as pd
+import numpy as np
+from distro import Distribution
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Streaming Counters
+-------------------------------------------
+Counters that are fed the rating file in
+chunks, for data that does not fit in memory.
+Node ids are used directly as array indices,
+so memory grows with the largest node id and
+not with the number of rows read.
+'''
+
+
+# Read the given columns of the rating csv in chunks of rows
+def read_chunks(path, usecols, chunksize=10**6):
+    return pd.read_csv(path, sep=',', usecols=list(usecols), chunksize=chunksize)
+
+
+# Resize a counter array so it can be indexed by size - 1
+def grow(counts, size):
+    if size <= len(counts):
+        return counts
+
+    grown = np.zeros(max(size, 2 * len(counts)), dtype=counts.dtype)
+    grown[:len(counts)] = counts
+    return grown
+
+
+class InteractionCounter:
+
+    def __init__(self):
+        self.num_in = np.zeros(0, dtype=np.int64)
+        self.num_out = np.zeros(0, dtype=np.int64)
+        self.rows = 0
+
+    # Add the interactions of one chunk of edges
+    def update(self, source, target):
+        source = np.asarray(source)
+        target = np.asarray(target)
+        if len(source) == 0:
+            return
+
+        if min(source.min(), target.min()) < 0:
+            raise ValueError('node ids must be non-negative integers')
+
+        size = int(max(source.max(), target.max())) + 1
+        self.num_in = grow(self.num_in, size)
+        self.num_out = grow(self.num_out, size)
+
+        self.num_out[:size] += np.bincount(source, minlength=size)
+        self.num_in[:size] += np.bincount(target, minlength=size)
+        self.rows += len(source)
+
+    # Same table as Distribution.interaction_counts
+    def counts(self):
+        total = self.num_in + self.num_out
+        users = np.flatnonzero(total)
+
+        return pd.DataFrame({'User': users,
+                             'In': self.num_in[users],
+                             'Out': self.num_out[users],
+                             'Num Interactions': total[users]})
+
+    # k users with the most interactions, kept in a heap of size k
+    def top_k(self, k=5, by='Num Interactions'):
+        total = self.num_in + self.num_out
+        values = {'In': self.num_in, 'Out': self.num_out, 'Num Interactions': total}.get(by)
+        if values is None:
+            raise ValueError(f"by must be 'In', 'Out' or 'Num Interactions', not {by!r}")
+
+        users = np.flatnonzero(total)
+        top = heapq.nlargest(k, zip(values[users].tolist(), (-users).tolist()))
+
+        return pd.Series([-u for _, u in top], name='User', dtype=np.int64)
+
+
+# Rank users straight from a csv without loading it into memory
+def top_k_users_csv(path, k=5, by='Num Interactions', chunksize=10**6):
+    counter = InteractionCounter()
+    for chunk in read_chunks(path, ['SOURCE', 'TARGET'], chunksize):
+        counter.update(chunk['SOURCE'].to_numpy(), chunk['TARGET'].to_numpy())
+
+    return counter.top_k(k, by)
+
+
+class StreamingDegrees(InteractionCounter):
+
+    # sign is 'all', 'positive' (L+) or 'negative' (L-)
+    def __init__(self, sign='all'):
+        if sign not in ('all', 'positive', 'negative'):
+            raise ValueError(f"sign must be 'all', 'positive' or 'negative', not {sign!r}")
+        super().__init__()
+        self.sign = sign
+
+    # Add one chunk of edges, keeping only those of the chosen sign
+    def update(self, source, target, rating=None):
+        if self.sign != 'all':
+            if rating is None:
+                raise ValueError(f'rating is needed to keep {self.sign} edges')
+            rating = np.asarray(rating)
+            keep = rating > 0 if self.sign == 'positive' else rating < 0
+            source = np.asarray(source)[keep]
+            target = np.asarray(target)[keep]
+
+        super().update(source, target)
+
+    # Node and degree of every node seen so far, as the graph degree frames
+    def degree_frame(self, direction='in'):
+        counts = self.counts()
+        return pd.DataFrame({'node': counts['User'].to_numpy(),
+                             'degree': counts['In' if direction == 'in' else 'Out'].to_numpy()})
+
+    # Same n, p, cdf, ccdf table as Distribution.distributions
+    def distributions(self, direction='in'):
+        return Distribution.distributions(self.degree_frame(direction))
+
+
+# In and out degree distributions of a csv read in chunks. Every row counts
+# as an edge, so repeated (SOURCE, TARGET) rows are not merged as in
+# nx.DiGraph, and the tables only equal the graph's when no pair is rated twice
+def degree_distributions_csv(path, sign='all', chunksize=10**6):
+    degrees = StreamingDegrees(sign)
+    usecols = ['SOURCE', 'TARGET'] if sign == 'all' else ['SOURCE', 'TARGET', 'RATING']
+    for chunk in read_chunks(path, usecols, chunksize):
+        rating = chunk['RATING'].to_numpy() if sign != 'all' else None
+        degrees.update(chunk['SOURCE'].to_numpy(), chunk['TARGET'].to_numpy(), rating)
+
+    return degrees.distributions('in'), degrees.distributions('out')
@@ -0,0 +1,88 @@
+import argparse
+
+import pandas as pd
+import numpy as np
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Synthetic Ratings
+-------------------------------------------
+Seeded generator for rating data shaped
+like bitcoin-otc: SOURCE, TARGET, RATING,
+TIME rows with power-law in and out degrees
+(Chung-Lu style node weights) and a tunable
+share of positive ratings.
+
+    python synthetic.py 1000000 synthetic.csv
+'''
+
+# Rating value shares on bitcoin-otc, roughly, for 1..10 and -1..-10
+POSITIVE_SHARES = np.array([.55, .17, .08, .04, .04, .02, .01, .02, .01, .06])
+NEGATIVE_SHARES = np.array([.30, .05, .05, .03, .05, .02, .02, .02, .01, .45])
+
+# Time span of the bitcoin-otc ratings, in epoch seconds
+START_TIME = 1289241911.72836
+END_TIME = 1453684323.11817
+
+
+# Node sampling weights giving a degree distribution p_k ~ k^-gamma
+def power_law_weights(num_nodes, gamma, rng):
+    weights = np.arange(1, num_nodes + 1) ** (-1 / (gamma - 1))
+    return rng.permutation(weights / weights.sum())
+
+
+def make_ratings(num_edges, num_nodes=None, gamma=2.2, positive_ratio=0.9, seed=0):
+    rng = np.random.default_rng(seed)
+
+    if num_nodes is None:
+        num_nodes = max(10, num_edges // 6)
+
+    # Endpoints drawn independently from the out and in weights
+    out_cdf = np.cumsum(power_law_weights(num_nodes, gamma, rng))
+    in_cdf = np.cumsum(power_law_weights(num_nodes, gamma, rng))
+    source = np.minimum(np.searchsorted(out_cdf, rng.random(num_edges)), num_nodes - 1) + 1
+    target = np.minimum(np.searchsorted(in_cdf, rng.random(num_edges)), num_nodes - 1) + 1
+
+    # No self ratings
+    loops = source == target
+    target[loops] = target[loops] % num_nodes + 1
+
+    # Signed ratings in -10..-1 and 1..10
+    positive = rng.random(num_edges) < positive_ratio
+    magnitude = np.where(positive,
+                         rng.choice(np.arange(1, 11), num_edges, p=POSITIVE_SHARES / POSITIVE_SHARES.sum()),
+                         rng.choice(np.arange(1, 11), num_edges, p=NEGATIVE_SHARES / NEGATIVE_SHARES.sum()))
+    rating = np.where(positive, magnitude, -magnitude)
+
+    time = np.sort(rng.uniform(START_TIME, END_TIME, num_edges))
+
+    return pd.DataFrame({'SOURCE': source, 'TARGET': target, 'RATING': rating, 'TIME': time})
+
+
+# Ratings frame as the analysis scripts see it after loading
+def make_loaded_ratings(num_edges, **kwargs):
+    df = make_ratings(num_edges, **kwargs)
+    df['TIME'] = pd.to_datetime(df['TIME'], unit='s')
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('edges', type=int)
+    parser.add_argument('path')
+    parser.add_argument('--nodes', type=int, default=None)
+    parser.add_argument('--gamma', type=float, default=2.2)
+    parser.add_argument('--positive-ratio', type=float, default=0.9)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = make_ratings(args.edges, args.nodes, args.gamma, args.positive_ratio, args.seed)
+    df.to_csv(args.path, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Small rating frame with repeated pairs, pairs rated with both signs and
+# users that only rate or are only rated. Endpoints are drawn with skewed
+# weights so degrees spread out, times cover about five years
+@pytest.fixture(scope='session')
+def df():
+    rng = np.random.default_rng(7)
+    num_ratings, num_users = 3000, 250
+
+    weights = 1 / np.arange(1, num_users + 1)
+    source = rng.choice(num_users, num_ratings, p=weights / weights.sum()) + 1
+    target = rng.permutation(num_users)[rng.choice(num_users, num_ratings, p=weights / weights.sum())] + 1
+    target = np.where(source == target, target % num_users + 1, target)
+
+    rating = rng.integers(1, 11, num_ratings) * np.where(rng.random(num_ratings) < 0.8, 1, -1)
+    time = np.sort(rng.uniform(1.29e9, 1.45e9, num_ratings))
+
+    return pd.DataFrame({'SOURCE': source, 'TARGET': target, 'RATING': rating,
+                         'TIME': pd.to_datetime(time, unit='s')})
@@ -0,0 +1,48 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+import assortativity
+from ingest import build_graph
+from signed_graph import SignedGraph
+
+VIEWS = {'G': lambda df: df, 'L+': lambda df: df[df['RATING'] > 0], 'L-': lambda df: df[df['RATING'] < 0]}
+
+
+@pytest.fixture(scope='module')
+def table(df):
+    return assortativity.assortativity(SignedGraph.from_frame(df)).set_index('network')
+
+
+@pytest.mark.parametrize('view', list(VIEWS))
+@pytest.mark.parametrize('x, y', assortativity.PAIRS)
+def test_degree_assortativity_matches_networkx(df, table, view, x, y):
+    expected = nx.degree_assortativity_coefficient(build_graph(VIEWS[view](df)), x=x, y=y)
+    assert table.loc[view, f'{x}-{y}'] == pytest.approx(expected, abs=1e-10)
+
+
+# Pearson r over the edges of the mean rating received by either end
+@pytest.mark.parametrize('view', list(VIEWS))
+def test_rating_assortativity_brute_force(df, table, view):
+    G = build_graph(VIEWS[view](df))
+    mean = {v: np.mean([r for _, _, r in G.in_edges(v, data='RATING')]) for v in G if G.in_degree(v)}
+    pairs = np.array([(mean[u], mean[v]) for u, v in G.edges() if u in mean and v in mean])
+    assert table.loc[view, 'rating'] == pytest.approx(np.corrcoef(pairs.T)[0, 1], abs=1e-10)
+
+
+@pytest.mark.parametrize('view', list(VIEWS))
+def test_knn_matches_networkx(df, view):
+    k, knn = assortativity.knn_curves(SignedGraph.from_frame(df))[view]
+    expected = nx.average_degree_connectivity(build_graph(VIEWS[view](df)), source='out', target='in')
+    expected = {degree: value for degree, value in expected.items() if degree > 0}
+    assert dict(zip(k.tolist(), knn.tolist())) == pytest.approx(expected)
+
+
+# Every point is r of the graph of the pairs rated by then. The first is a
+# single edge, where r is undefined
+def test_assortativity_over_time_matches_networkx(df):
+    times, r = assortativity.assortativity_over_time(df, num_points=5)
+    ordered = df.sort_values('TIME', kind='stable')
+    for t, value in list(zip(times, r))[1:]:
+        expected = nx.degree_assortativity_coefficient(build_graph(ordered[ordered['TIME'] <= t]), x='out', y='in')
+        assert value == pytest.approx(expected, abs=1e-10)
@@ -0,0 +1,40 @@
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from distro import Distribution
+
+
+# Replay the new pairs in TIME order on an nx.DiGraph. Before every edge
+# each node already in the graph is exposed once at its degree, and the
+# target gains at its degree if it was there already
+def replay(df, degree):
+    ordered = df.sort_values('TIME', kind='stable')
+    G = nx.DiGraph()
+    gains, exposure = Counter(), Counter()
+
+    for u, v in zip(ordered['SOURCE'].tolist(), ordered['TARGET'].tolist()):
+        if G.has_edge(u, v):
+            continue
+        k = G.in_degree if degree == 'in' else G.degree
+        exposure.update(k(node) for node in G)
+        if v in G:
+            gains[k(v)] += 1
+        G.add_edge(u, v)
+
+    return gains, exposure
+
+
+@pytest.mark.parametrize('degree', ['in', 'total'])
+@pytest.mark.parametrize('sign', ['all', 'positive'])
+def test_attachment_rates_match_replay(df, degree, sign):
+    frame = df if sign == 'all' else df[df['RATING'] > 0]
+    rates = Distribution.attachment_rates(frame, degree)
+    gains, exposure = replay(frame, degree)
+
+    assert rates['k'].tolist() == sorted(exposure)
+    assert rates['exposure'].tolist() == [exposure[k] for k in rates['k']]
+    assert rates['gains'].tolist() == [gains[k] for k in rates['k']]
+    np.testing.assert_allclose(rates['pi'], rates['gains'] / rates['exposure'])
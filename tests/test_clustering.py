@@ -0,0 +1,56 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+import clustering
+from distro import Distribution
+from ingest import build_graph
+from signed_graph import SignedGraph
+
+
+@pytest.fixture(scope='module')
+def graph(df):
+    G = build_graph(df)
+    G.add_edge(int(df['SOURCE'].iloc[0]), int(df['SOURCE'].iloc[0]), RATING=1)
+    return G
+
+
+@pytest.mark.parametrize('directed', [True, False])
+def test_clustering_matches_networkx(graph, directed):
+    G = graph if directed else graph.to_undirected()
+    expected = nx.clustering(G)
+    got = clustering.clustering(G)
+    assert got.keys() == expected.keys()
+    np.testing.assert_allclose([got[n] for n in expected], list(expected.values()), atol=1e-12)
+
+
+# Small chunks split the triangle search many times, the sum must not change
+def test_closed_walks_in_chunks_is_diagonal_of_cube(graph):
+    S = clustering.strip_loops(clustering.symmetrize(clustering.adjacency(graph)))
+    dense = S.toarray()
+    expected = np.diag(dense @ dense @ dense)
+    for max_wedges in (1, 7, clustering.MAX_WEDGES):
+        np.testing.assert_allclose(clustering.closed_walks(S, max_wedges), expected)
+
+
+@pytest.mark.parametrize('view', ['G', 'L+', 'L-'])
+def test_signed_graph_clustering_matches_networkx(df, view):
+    frame = {'G': df, 'L+': df[df['RATING'] > 0], 'L-': df[df['RATING'] < 0]}[view]
+    graph = SignedGraph.from_frame(df)
+    net = {'G': graph, 'L+': graph.positive(), 'L-': graph.negative()}[view]
+
+    expected = pd.Series(nx.clustering(build_graph(frame))).sort_index()
+    got = net.clustering().set_index('node')['CC']
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), atol=1e-12)
+    assert (got.index.to_numpy() == expected.index.to_numpy()).all()
+
+
+def test_cc_by_degree_matches_networkx(graph):
+    U = graph.to_undirected()
+    cc, degree = nx.clustering(U), dict(U.degree())
+    expected = pd.Series(cc).groupby(pd.Series(degree), sort=False).mean()
+
+    k, mean = Distribution.cc_by_degree(graph)
+    np.testing.assert_array_equal(k, expected.index.to_numpy())
+    np.testing.assert_allclose(mean, expected.to_numpy(), atol=1e-12)
@@ -0,0 +1,66 @@
+import networkx as nx
+import pandas as pd
+import pytest
+
+import decompose
+from ingest import build_graph
+from signed_graph import SignedGraph
+
+VIEWS = {'G': lambda df: df, 'L+': lambda df: df[df['RATING'] > 0], 'L-': lambda df: df[df['RATING'] < 0]}
+
+
+def net_and_graph(df, view):
+    graph = decompose.NETWORKS[view](SignedGraph.from_frame(df))
+    return graph, build_graph(VIEWS[view](df))
+
+
+@pytest.mark.parametrize('view', list(VIEWS))
+@pytest.mark.parametrize('connection', ['weak', 'strong'])
+def test_components_match_networkx(df, view, connection):
+    net, G = net_and_graph(df, view)
+    frame = decompose.components(net, connection)
+
+    find = nx.weakly_connected_components if connection == 'weak' else nx.strongly_connected_components
+    expected = {frozenset(c) for c in find(G)}
+    got = {frozenset(group['node'].tolist()) for _, group in frame.groupby('component')}
+    assert got == expected
+    assert (frame['size'] == frame.groupby('component')['node'].transform('size')).all()
+
+
+# nx.core_number leaves self-loops out, add one to check they are ignored
+@pytest.mark.parametrize('view', list(VIEWS))
+def test_total_cores_match_networkx(df, view):
+    net, G = net_and_graph(df, view)
+    got = decompose.cores(net, 'total')
+    assert dict(zip(got['node'].tolist(), got['core'].tolist())) == nx.core_number(G)
+
+    loop = df.iloc[:1].assign(TARGET=df['SOURCE'].iloc[0])
+    net, G = net_and_graph(pd.concat([df, loop], ignore_index=True), view)
+    G.remove_edges_from(nx.selfloop_edges(G))
+    got = decompose.cores(net, 'total')
+    assert dict(zip(got['node'].tolist(), got['core'].tolist())) == nx.core_number(G)
+
+
+# In and out cores by brute force: repeatedly drop every node whose in or
+# out degree among the nodes left is below k
+def brute_cores(G, direction):
+    core, H, k = {}, G.copy(), 0
+    H.remove_edges_from(nx.selfloop_edges(H))
+    while len(H):
+        degree = H.in_degree() if direction == 'in' else H.out_degree()
+        low = [v for v, d in degree if d <= k]
+        if not low:
+            k += 1
+            continue
+        for v in low:
+            core[v] = k
+        H.remove_nodes_from(low)
+    return core
+
+
+@pytest.mark.parametrize('view', list(VIEWS))
+@pytest.mark.parametrize('direction', ['in', 'out'])
+def test_directed_cores_brute_force(df, view, direction):
+    net, G = net_and_graph(df, view)
+    got = decompose.cores(net, direction)
+    assert dict(zip(got['node'].tolist(), got['core'].tolist())) == brute_cores(G, direction)
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import bench
+
+
+# Each module is imported in a fresh interpreter, as bench.check_imports does
+@pytest.mark.parametrize('module', ['distro', 'bitcoin_otc'])
+def test_import_is_cheap_and_lazy(module):
+    seconds, loaded = bench.import_cost(module)
+    assert loaded == []
+    assert seconds <= bench.IMPORT_BUDGET_S
+
+
+# The sampled C(k) and its process pool are only loaded when used
+def test_distro_defers_approx_clustering():
+    code = 'import sys, distro; print("approx_clustering" in sys.modules)'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(bench.__file__))).stdout
+    assert out.strip() == 'False'
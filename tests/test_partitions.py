@@ -0,0 +1,77 @@
+import json
+import multiprocessing
+import os
+
+import pandas as pd
+import pytest
+
+import partitions
+from ingest import load_ratings
+from synthetic import make_ratings
+
+
+def write_csv(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    make_ratings(3000, num_nodes=150, seed=3).to_csv(path, index=False)
+    return path
+
+
+def test_range_matches_filtered_frame(tmp_path):
+    path = write_csv(tmp_path)
+    df = load_ratings(path)
+    start, end = pd.Timestamp('2012-03-15'), pd.Timestamp('2013-07-01')
+
+    expected = df[(df['TIME'] >= start) & (df['TIME'] < end)].reset_index(drop=True)
+    got = partitions.load_range(path, start, end)
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), expected, check_dtype=False)
+
+
+# A touched but unchanged csv is hashed once, then its new mtime is trusted
+def test_touched_csv_refreshes_mtime(tmp_path, monkeypatch):
+    path = write_csv(tmp_path)
+    partitions.PartitionStore(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    hashed, file_hash = [], partitions.file_hash
+    monkeypatch.setattr(partitions, 'file_hash', lambda p: hashed.append(p) or file_hash(p))
+    partitions.PartitionStore(path)
+    partitions.PartitionStore(path)
+
+    with open(os.path.join(partitions.partition_root(path), 'meta.json')) as f:
+        assert json.load(f)['mtime_ns'] == os.stat(path).st_mtime_ns
+    assert len(hashed) == 1
+
+
+# Each process builds a fresh copy of the partitions at the same moment
+def open_store(path, barrier):
+    barrier.wait()
+    store = partitions.PartitionStore(path)
+    return len(store.frame())
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='needs fork')
+def test_concurrent_builds_install_one_copy(tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    make_ratings(50000, num_nodes=2000, seed=5).to_csv(path, index=False)
+
+    workers = 6
+    context = multiprocessing.get_context('fork')
+    barrier = context.Manager().Barrier(workers)
+    with context.Pool(workers) as pool:
+        rows = pool.starmap(open_store, [(path, barrier)] * workers)
+
+    assert rows == [50000] * workers
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(('.tmp', '.old'))]
+    assert partitions.read_meta(path, 'M') is not None
+
+
+# Partitions of an older csv are swapped out, leaving no build directories
+def test_changed_csv_replaces_partitions(tmp_path):
+    path = write_csv(tmp_path)
+    partitions.PartitionStore(path)
+    make_ratings(2000, num_nodes=150, seed=4).to_csv(path, index=False)
+
+    store = partitions.PartitionStore(path)
+    assert store.table['rows'].sum() == 2000
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(('.tmp', '.old'))]
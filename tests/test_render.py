@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+
+import pytest
+
+import render
+
+
+@pytest.fixture
+def csv(df, tmp_path):
+    path = str(tmp_path / 'ratings.csv')
+    frame = df.copy()
+    frame['TIME'] = frame['TIME'].astype('int64') // 10**9
+    frame.to_csv(path, index=False)
+    return path
+
+
+def test_unknown_figure_is_rejected_before_rendering(csv, tmp_path):
+    out_dir = str(tmp_path / 'figures')
+    with pytest.raises(ValueError, match='unknown figures'):
+        render.render(['top5_in.png', 'top5.png'], csv, out_dir, cache_dir='')
+    assert not os.path.exists(out_dir)
+
+
+# Workers get the shared inputs whether they are forked or started fresh
+@pytest.mark.parametrize('methods', [['fork', 'spawn'], ['spawn']])
+def test_render_through_the_pool(csv, tmp_path, monkeypatch, methods):
+    monkeypatch.setattr(render.multiprocessing, 'get_all_start_methods', lambda: methods)
+    out_dir = str(tmp_path / 'figures')
+
+    timings = render.render(['top5_in.png', 'top5_out.png'], csv, out_dir, workers=2, cache_dir='')
+    assert sorted(timings) == ['top5_in.png', 'top5_out.png']
+    assert all(os.path.getsize(os.path.join(out_dir, name)) > 0 for name in timings)
+
+    # Nothing changed, so a second run skips both
+    assert render.render(['top5_in.png', 'top5_out.png'], csv, out_dir, workers=2, cache_dir='') == {}
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+import reputation
+from signed_graph import SignedGraph
+
+
+# Nodes of the frame that nobody rated
+def unrated(df):
+    return set(df['SOURCE']) - set(df['TARGET'])
+
+
+def test_unrated_users_have_no_score(df):
+    scores, _ = reputation.reputation(SignedGraph.from_frame(df))
+    missing = scores['node'].isin(unrated(df))
+
+    assert missing.any()
+    assert scores.loc[missing, ['goodness', 'signed_pagerank']].isna().all().all()
+    assert scores.loc[~missing, ['goodness', 'signed_pagerank']].notna().all().all()
+
+
+# A user who only rates keeps the starting goodness of 1.0 if it is not
+# dropped, which would rank it above everyone rated
+def test_unrated_user_is_not_ranked_above_rated_ones():
+    df = pd.DataFrame({'SOURCE': [1, 1, 2], 'TARGET': [2, 3, 3], 'RATING': [5, -5, 2],
+                       'TIME': pd.to_datetime([1, 2, 3], unit='s')})
+    scores, _ = reputation.reputation(SignedGraph.from_frame(df))
+
+    for column in ('goodness', 'signed_pagerank'):
+        ranked = reputation.top(scores, column)['node'].tolist()
+        assert sorted(ranked) == [2, 3]
+    assert np.isnan(scores.set_index('node').loc[1, 'goodness'])
+
+
+# NaN goodness of unrated users falls back to the default on a warm start
+def test_warm_start_from_scores_with_unrated_users(df):
+    graph = SignedGraph.from_frame(df)
+    cold, cold_iterations = reputation.fairness_goodness(graph)
+    warm, warm_iterations = reputation.fairness_goodness(graph, previous=cold)
+
+    assert warm_iterations < cold_iterations
+    np.testing.assert_allclose(warm['goodness'], cold['goodness'], atol=1e-5)
@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import result_cache
+from result_cache import MISSING, ResultCache
+
+
+def test_put_then_get(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    frame = pd.DataFrame({'node': [3, 1, 2], 'degree': [4, 0, 7]})
+    cache.put('k', (frame, 2.5, ['a', 'b']))
+
+    got = cache.get('k')
+    pd.testing.assert_frame_equal(got[0], frame)
+    assert got[1:] == (2.5, ['a', 'b'])
+    assert cache.get('other') is MISSING
+
+
+# An interrupted write leaves neither an entry nor its temporary file
+def test_interrupted_put_removes_its_temporary_file(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(result_cache.np, 'savez', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        cache.put('k', np.arange(5))
+
+    assert os.listdir(tmp_path) == []
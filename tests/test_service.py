@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from distro import Distribution
+from service import QueryService, UserStore
+from signed_graph import SignedGraph
+
+
+@pytest.fixture(scope='module')
+def service(df):
+    return QueryService(UserStore(df))
+
+
+@pytest.fixture(scope='module')
+def store(df):
+    return UserStore(df)
+
+
+# Users that only rate, that are only rated, the busiest and a few others
+def sample_users(df):
+    sources, targets = set(df['SOURCE']), set(df['TARGET'])
+    never_rated = sorted(sources - targets)
+    never_rater = sorted(targets - sources)
+    busiest = pd.concat([df['SOURCE'], df['TARGET']]).value_counts().index[:3].tolist()
+    others = np.random.default_rng(0).choice(sorted(sources | targets), 10, replace=False).tolist()
+    return never_rated[:2] + never_rater[:2] + busiest + others
+
+
+def test_lookup_matches_distribution_and_graph(store, df):
+    users = sample_users(df)
+    assert set(df['SOURCE']) - set(df['TARGET']) & set(users)
+
+    overall = Distribution.overall_ratings(df).set_index('node')['overall_rating']
+    graph = SignedGraph.from_frame(df)
+    nets = {'G': graph, 'L+': graph.positive(), 'L-': graph.negative()}
+    degrees = {(name, d): net.degree_frame(d).set_index('node')['degree']
+               for name, net in nets.items() for d in ('in', 'out')}
+
+    for user in users:
+        result = store.lookup(user)
+
+        if user in overall.index:
+            assert result['overall_rating'] == pytest.approx(overall[user])
+        else:
+            assert result['overall_rating'] is None
+
+        for name in nets:
+            for d in ('in', 'out'):
+                assert result['degree'][name][d] == degrees[name, d].get(user, 0)
+
+        t_in, t_out, k_in, k_out = Distribution.k_vs_t(user, df)
+        for direction, t, k in (('in', t_in, k_in), ('out', t_out, k_out)):
+            series = result['k_vs_t'][direction]
+            assert series['k'] == k.tolist()
+            np.testing.assert_array_equal(pd.to_datetime(series['TIME']).to_numpy(), t.to_numpy())
+
+
+@pytest.mark.parametrize('body', [b'null', b'{"ids": 5}', b'{"ids": "1,2"}', b'{"ids": [1e30]}',
+                                  b'{"ids": [1.0]}', b'{"ids": [true]}', b'{"ids": [null]}', b'7'])
+def test_bad_bulk_payloads_are_400(service, body):
+    status, payload = service.handle('POST', '/users', body)
+    assert status == 400
+    assert 'error' in json.loads(payload)
+
+
+def test_bulk_payload(service, df):
+    user = int(df['SOURCE'].iloc[0])
+    status, payload = service.handle('POST', '/users', json.dumps({'ids': [user, -1]}).encode())
+    result = json.loads(payload)
+    assert status == 200
+    assert [u['user'] for u in result['users']] == [user]
+    assert result['missing'] == [-1]
+
+
+# Raw request through serve_connection, returns the status line
+def exchange(service, request):
+    async def run():
+        server = await asyncio.start_server(service.serve_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        return response.split(b'\r\n', 1)[0].decode()
+    return asyncio.run(run())
+
+
+def test_bad_content_length_is_400(service):
+    request = b'POST /users HTTP/1.1\r\nContent-Length: abc\r\n\r\n{"ids": [1]}'
+    assert exchange(service, request) == 'HTTP/1.1 400 Bad Request'
+
+
+def test_unexpected_error_is_500(service, monkeypatch):
+    def fail(*args):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(service.store, 'lookup', fail)
+    assert exchange(service, b'GET /user/1 HTTP/1.1\r\nConnection: close\r\n\r\n') == \
+        'HTTP/1.1 500 Internal Server Error'
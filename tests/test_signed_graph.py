@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from ingest import Ratings, build_graph
+from signed_graph import SignedGraph
+
+
+# Degrees as a node -> degree dict, for comparing against networkx
+def degree_dict(frame):
+    return dict(zip(frame['node'].tolist(), frame['degree'].tolist()))
+
+
+@pytest.mark.parametrize('view', ['G', 'L+', 'L-'])
+def test_degrees_and_neighbors_match_networkx(df, view):
+    frame = {'G': df, 'L+': df[df['RATING'] > 0], 'L-': df[df['RATING'] < 0]}[view]
+    graph = SignedGraph.from_frame(df)
+    net = {'G': graph, 'L+': graph.positive(), 'L-': graph.negative()}[view]
+    expected = build_graph(frame)
+
+    assert net.num_nodes() == expected.number_of_nodes()
+    assert net.num_edges() == expected.number_of_edges()
+    assert degree_dict(net.degree_frame('in')) == dict(expected.in_degree())
+    assert degree_dict(net.degree_frame('out')) == dict(expected.out_degree())
+
+    for node in list(expected)[:50]:
+        assert sorted(net.out_neighbors(node).tolist()) == sorted(expected.successors(node))
+        assert sorted(net.in_neighbors(node).tolist()) == sorted(expected.predecessors(node))
+
+
+# The last rating of a pair is the one kept, as nx.DiGraph keeps it
+@pytest.mark.parametrize('view', ['G', 'L+', 'L-'])
+def test_edge_ratings_match_networkx(df, view):
+    frame = {'G': df, 'L+': df[df['RATING'] > 0], 'L-': df[df['RATING'] < 0]}[view]
+    graph = SignedGraph.from_frame(df)
+    net = {'G': graph, 'L+': graph.positive(), 'L-': graph.negative()}[view]
+
+    expected = {(u, v): r for u, v, r in build_graph(frame).edges(data='RATING')}
+    got = net.edge_frame()
+    assert dict(zip(zip(got['SOURCE'].tolist(), got['TARGET'].tolist()), got['RATING'].tolist())) == expected
+
+
+@pytest.mark.parametrize('sign', ['positive', 'negative'])
+def test_from_ratings_with_mask_matches_filtered_frame(df, sign):
+    ratings = Ratings(df['SOURCE'], df['TARGET'], df['RATING'], df['TIME'].to_numpy().view(np.int64))
+    mask = getattr(ratings, sign)()
+    graph = SignedGraph.from_ratings(ratings, mask)
+
+    expected = build_graph(df[df['RATING'] > 0] if sign == 'positive' else df[df['RATING'] < 0])
+    assert graph.num_nodes() == len(graph.nodes) == expected.number_of_nodes()
+    assert graph.num_edges() == expected.number_of_edges()
+    assert degree_dict(graph.degree_frame('in')) == dict(expected.in_degree())
+    assert degree_dict(graph.degree_frame('out')) == dict(expected.out_degree())
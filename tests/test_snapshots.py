@@ -0,0 +1,53 @@
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import snapshots
+from ingest import build_graph
+
+
+@pytest.mark.parametrize('window, stride', [('90D', '30D'), ('30D', '60D'), ('MS', 'MS')])
+def test_windows_match_networkx(df, window, stride):
+    table, dists = snapshots.snapshots(df, window, stride, with_clustering=True)
+    assert len(table) > 3
+
+    for end, row in table.iterrows():
+        frame = df[(df['TIME'] >= row['start']) & (df['TIME'] < end)]
+        G = build_graph(frame)
+
+        assert row['ratings'] == len(frame)
+        assert row['nodes'] == G.number_of_nodes()
+        assert row['edges'] == G.number_of_edges()
+        if len(frame) == 0:
+            continue
+
+        assert row['max_in_degree'] == max(dict(G.in_degree()).values())
+        assert row['max_out_degree'] == max(dict(G.out_degree()).values())
+        weak = [len(c) for c in nx.weakly_connected_components(G)]
+        assert row['components'] == len(weak)
+        assert row['giant_size'] == max(weak)
+        assert row['avg_clustering'] == pytest.approx(nx.average_clustering(G.to_undirected()), abs=1e-12)
+
+        for direction, degree in (('in', G.in_degree()), ('out', G.out_degree())):
+            got = dists[(dists['TIME'] == end) & (dists['direction'] == direction)]
+            assert dict(zip(got['k'].tolist(), got['n'].tolist())) == Counter(dict(degree).values())
+
+
+# Moving the window forward in uneven steps keeps the counts of the slice
+def test_window_state_advance(df):
+    ordered = df.sort_values('TIME', kind='stable')
+    state = snapshots.WindowState(ordered['SOURCE'].to_numpy(), ordered['TARGET'].to_numpy())
+    rng = np.random.default_rng(0)
+
+    lo = hi = 0
+    while hi < len(ordered):
+        hi = min(hi + int(rng.integers(0, 400)), len(ordered))
+        lo = int(rng.integers(lo, hi + 1))
+        state.advance(lo, hi)
+
+        G = build_graph(ordered.iloc[lo:hi])
+        in_degree = dict(zip(state.nodes.tolist(), state.in_degree.tolist()))
+        assert {node: k for node, k in in_degree.items() if k} == {n: k for n, k in G.in_degree() if k}
+        assert int(state.out_degree.sum()) == G.number_of_edges()
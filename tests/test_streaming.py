@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from streaming import StreamingDegrees, degree_distributions_csv
+
+
+def test_sign_keeps_edges_of_that_sign():
+    source, target, rating = np.array([1, 1, 2, 3]), np.array([2, 3, 3, 1]), np.array([5, -1, 2, -7])
+    degrees = {}
+    for sign in ('all', 'positive', 'negative'):
+        counter = StreamingDegrees(sign)
+        counter.update(source, target, rating)
+        frame = counter.degree_frame('out')
+        degrees[sign] = dict(zip(frame['node'].tolist(), frame['degree'].tolist()))
+
+    assert degrees['all'] == {1: 2, 2: 1, 3: 1}
+    assert degrees['positive'] == {1: 1, 2: 1, 3: 0}
+    assert degrees['negative'] == {1: 1, 3: 1}
+
+
+# A misspelt sign would otherwise count every edge as negative
+@pytest.mark.parametrize('sign', ['pos', 'Positive', 'L+', None])
+def test_unknown_sign_is_rejected(tmp_path, sign):
+    path = tmp_path / 'ratings.csv'
+    path.write_text('SOURCE,TARGET,RATING,TIME\n1,2,5,1289241912\n')
+
+    with pytest.raises(ValueError, match='sign must be'):
+        StreamingDegrees(sign)
+    with pytest.raises(ValueError, match='sign must be'):
+        degree_distributions_csv(str(path), sign)
+
+
+def test_signed_update_needs_ratings():
+    with pytest.raises(ValueError, match='rating is needed'):
+        StreamingDegrees('positive').update(np.array([1]), np.array([2]))
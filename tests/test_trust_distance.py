@@ -0,0 +1,81 @@
+import math
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import trust_distance
+from ingest import MAX_RATING, build_graph
+from signed_graph import SignedGraph
+
+
+@pytest.fixture(scope='module')
+def graph(df):
+    return SignedGraph.from_frame(df)
+
+
+# L+ as an nx.DiGraph with the weighted edge lengths, reversed for 'in'
+@pytest.fixture(scope='module', params=['out', 'in'])
+def positive(df, request):
+    G = build_graph(df[df['RATING'] > 0])
+    for u, v, r in G.edges(data='RATING'):
+        G[u][v]['length'] = (MAX_RATING + 1 - r) / MAX_RATING
+    return request.param, G if request.param == 'out' else G.reverse()
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_histogram_matches_networkx(graph, positive, weighted):
+    direction, G = positive
+    sources = sorted(G)[::7]
+    hist, per_source = trust_distance.distance_histogram(graph, sources, weighted, direction, batch_size=16)
+
+    counts = Counter()
+    per_source = per_source.set_index('source')
+    for s in sources:
+        lengths = nx.single_source_dijkstra_path_length(G, s, weight='length' if weighted else None)
+        reached = [d for node, d in lengths.items() if node != s]
+        counts.update(math.ceil(d - 1e-12) for d in reached)
+
+        row = per_source.loc[s]
+        assert row['reachable'] == len(reached)
+        if reached:
+            assert row['mean_distance'] == pytest.approx(np.mean(reached))
+            assert row['eccentricity'] == pytest.approx(max(reached))
+
+    assert dict(zip(hist['distance'].tolist(), hist['pairs'].tolist())) == counts
+
+
+def test_workers_agree(graph):
+    one = trust_distance.distance_histogram(graph, workers=1)
+    two = trust_distance.distance_histogram(graph, workers=2)
+    assert one[0].equals(two[0])
+    assert one[1].equals(two[1])
+
+
+def test_nearest_vetted_matches_networkx(graph, positive):
+    direction, G = positive
+    vetted = sorted(G)[::15]
+    got = trust_distance.nearest_vetted(graph, vetted, direction=direction).set_index('node')
+
+    for node in G:
+        lengths = {v: nx.shortest_path_length(G, v, node) for v in vetted if nx.has_path(G, v, node)}
+        if not lengths:
+            assert np.isnan(got.loc[node, 'distance'])
+            continue
+        best = min(lengths.values())
+        assert got.loc[node, 'distance'] == best
+        assert got.loc[node, 'nearest'] == min(v for v, d in lengths.items() if d == best)
+
+
+def test_weighted_nearest_vetted_matches_networkx(graph, positive):
+    direction, G = positive
+    vetted = sorted(G)[::15]
+    got = trust_distance.nearest_vetted(graph, vetted, weighted=True, direction=direction).set_index('node')
+
+    lengths = nx.multi_source_dijkstra_path_length(G, set(vetted), weight='length')
+    for node in G:
+        if node in lengths:
+            assert got.loc[node, 'distance'] == pytest.approx(lengths[node])
+        else:
+            assert np.isnan(got.loc[node, 'distance'])
@@ -0,0 +1,264 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra
+from ingest import MAX_RATING
+from instrument import from_env, traced
+from signed_graph import SignedGraph
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            Trust Distance
+-------------------------------------------
+Hops of positive trust between users, over
+the L+ adjacency. Many sources are searched
+per sweep: the frontier of a batch of k
+sources is a sparse k x n matrix and one
+product with the adjacency expands every
+source by a hop. Distances from a set of
+vetted users are one multi-source search in
+which every user also keeps the vetted user
+it was reached from.
+
+In the weighted variant a rating r is an
+edge of length (11 - r) / 10, so a 10 is a
+tenth of a hop and a 1 a whole hop, and
+distances come from csgraph.dijkstra.
+
+Direction 'out' follows ratings from the
+source (who the source trusts, and who they
+trust), 'in' walks them backwards.
+
+    python trust_distance.py bitcoinotc.csv --sample 1000 --vetted vetted.txt
+'''
+
+
+# L+ adjacency over the graph's dense ids, edge lengths from the ratings
+# when weighted, and reversed for direction 'in'
+def trust_adjacency(graph, weighted=False, direction='out'):
+    pos = graph.positive()
+    A = pos.adjacency()
+
+    # Masked adjacencies keep the CSR edge order, so the data lines up
+    if weighted:
+        A.data = (MAX_RATING + 1 - graph.rating[pos.mask].astype(np.float64)) / MAX_RATING
+    return A if direction == 'out' else sp.csr_matrix(A.T)
+
+
+# Dense ids of original node ids, KeyError for users not in the graph
+def dense_ids(graph, users):
+    users = np.asarray(users)
+    pos = np.minimum(np.searchsorted(graph.nodes, users), len(graph.nodes) - 1)
+    missing = graph.nodes[pos] != users
+    if missing.any():
+        raise KeyError(users[missing][0])
+    return pos
+
+
+# Hop distances from a batch of sources to every node, -1 when unreachable
+def bfs_batch(A, sources, max_hops=None):
+    k, n = len(sources), A.shape[0]
+    dist = np.full((k, n), -1, dtype=np.int16)
+    rows, cols = np.arange(k), np.asarray(sources)
+    dist[rows, cols] = 0
+
+    hop = 0
+    while len(rows) and (max_hops is None or hop < max_hops):
+        hop += 1
+        frontier = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(k, n))
+        reached = (frontier @ A).tocoo()
+
+        new = dist[reached.row, reached.col] < 0
+        rows, cols = reached.row[new], reached.col[new]
+        dist[rows, cols] = hop
+
+    return dist
+
+
+# Adjacency of the current process, set once per worker
+_graph = {}
+
+
+def _set_graph(indptr, indices, data, n):
+    _graph['A'] = sp.csr_matrix((data, indices, indptr), shape=(n, n))
+
+
+# Sum of two count arrays of different lengths
+def add_counts(a, b):
+    size = max(len(a), len(b))
+    return np.pad(a, (0, size - len(a))) + np.pad(b, (0, size - len(b)))
+
+
+# Distance counts and per-source summaries of a shard of sources. Weighted
+# distances are counted by their ceiling
+def sweep(sources, weighted, batch_size, max_hops):
+    A = _graph['A']
+    counts = np.zeros(1, dtype=np.int64)
+    rows = []
+
+    for lo in range(0, len(sources), batch_size):
+        batch = sources[lo:lo + batch_size]
+        if weighted:
+            dist = dijkstra(A, directed=True, indices=batch, limit=np.inf if max_hops is None else max_hops)
+            reached = np.isfinite(dist) & (dist > 0)
+
+            # Lengths are multiples of 1 / MAX_RATING, ceil them as integers
+            # so float sums that land a hair above a whole hop stay in its bin
+            steps = np.rint(dist[reached] * MAX_RATING).astype(np.int64)
+            bins = (steps + MAX_RATING - 1) // MAX_RATING
+        else:
+            dist = bfs_batch(A, batch, max_hops)
+            reached = dist > 0
+            bins = dist[reached].astype(np.int64)
+
+        counts = add_counts(counts, np.bincount(bins))
+
+        total = np.where(reached, dist, 0).sum(axis=1)
+        reach = reached.sum(axis=1)
+        rows.append(pd.DataFrame({'source': batch, 'reachable': reach,
+                                  'mean_distance': np.divide(total, reach, out=np.full(len(batch), np.nan),
+                                                             where=reach > 0),
+                                  'eccentricity': np.where(reached, dist, 0).max(axis=1)}))
+
+    return counts, pd.concat(rows, ignore_index=True)
+
+
+# Histogram of the distances from every source and one summary row per
+# source, the sources sharded over worker processes. max_hops bounds the
+# search, in edge lengths when weighted
+@traced
+def distance_histogram(graph, sources=None, weighted=False, direction='out', workers=1,
+                       batch_size=256, max_hops=None):
+    A = trust_adjacency(graph, weighted, direction)
+    sources = np.flatnonzero(graph.positive().node_mask()) if sources is None else dense_ids(graph, sources)
+    workers = workers or os.cpu_count()
+
+    _set_graph(A.indptr, A.indices, A.data, A.shape[0])
+    shards = [s for s in np.array_split(sources, workers) if len(s)]
+    run = partial(sweep, weighted=weighted, batch_size=batch_size, max_hops=max_hops)
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_set_graph,
+                                 initargs=(A.indptr, A.indices, A.data, A.shape[0])) as pool:
+            results = list(pool.map(run, shards))
+    else:
+        results = [run(shard) for shard in shards]
+
+    counts = np.zeros(1, dtype=np.int64)
+    for c, _ in results:
+        counts = add_counts(counts, c)
+    hist = pd.DataFrame({'distance': np.arange(len(counts)), 'pairs': counts})[1:]
+    hist = hist[hist['pairs'] > 0].reset_index(drop=True)
+    hist['share'] = hist['pairs'] / max(hist['pairs'].sum(), 1)
+
+    per_source = pd.concat([r for _, r in results], ignore_index=True)
+    per_source['source'] = graph.nodes[per_source['source'].to_numpy()]
+    return hist, per_source
+
+
+# Distance from the nearest vetted user to every node and which vetted
+# user that is (the lowest id among ties), one search from all of them
+def nearest_hops(A, vetted, max_hops=None):
+    n = A.shape[0]
+    dist = np.full(n, -1, dtype=np.int64)
+    nearest = np.full(n, -1, dtype=np.int64)
+    frontier = np.unique(vetted)
+    dist[frontier] = 0
+    nearest[frontier] = frontier
+
+    hop = 0
+    while len(frontier) and (max_hops is None or hop < max_hops):
+        hop += 1
+        lo, hi = A.indptr[frontier], A.indptr[frontier + 1]
+        lengths = hi - lo
+        starts = np.cumsum(lengths) - lengths
+        head = A.indices[np.repeat(lo - starts, lengths) + np.arange(lengths.sum())]
+        label = np.repeat(nearest[frontier], lengths)
+
+        new = dist[head] < 0
+        head, label = head[new], label[new]
+        order = np.lexsort((label, head))
+        head, label = head[order], label[order]
+        first = np.ones(len(head), dtype=bool)
+        first[1:] = head[1:] != head[:-1]
+
+        frontier = head[first]
+        dist[frontier] = hop
+        nearest[frontier] = label[first]
+
+    return dist, nearest
+
+
+# Distance of every user to the nearest vetted user, NaN when no chain of
+# positive ratings connects them
+@traced
+def nearest_vetted(graph, vetted, weighted=False, direction='out', max_hops=None):
+    A = trust_adjacency(graph, weighted, direction)
+    vetted = dense_ids(graph, vetted)
+
+    if weighted:
+        dist, _, nearest = dijkstra(A, directed=True, indices=vetted, min_only=True,
+                                    return_predecessors=True, limit=np.inf if max_hops is None else max_hops)
+        reached = np.isfinite(dist)
+    else:
+        dist, nearest = nearest_hops(A, vetted, max_hops)
+        reached = dist >= 0
+
+    present = graph.positive().node_mask() | np.isin(np.arange(len(graph.nodes)), vetted)
+    return pd.DataFrame({'node': graph.nodes[present],
+                         'distance': np.where(reached, dist, np.nan)[present],
+                         'nearest': np.where(reached, graph.nodes[np.maximum(nearest, 0)], -1)[present]})
+
+
+def main():
+    from_env()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='bitcoinotc.csv')
+    parser.add_argument('--vetted', help='file with one vetted user id per line, by default the 50 '
+                                         'users with the most positive ratings received')
+    parser.add_argument('--sample', type=int, default=1000, help='sources for the distance histogram, 0 for all')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--weighted', action='store_true')
+    parser.add_argument('--direction', choices=['out', 'in'], default='out')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--out', help='write the nearest vetted distances to this csv')
+    args = parser.parse_args()
+
+    graph = SignedGraph.load(args.path)
+    present = graph.nodes[graph.positive().node_mask()]
+
+    start = time.perf_counter()
+    sources = None
+    if args.sample:
+        rng = np.random.default_rng(args.seed)
+        sources = rng.choice(present, min(args.sample, len(present)), replace=False)
+    hist, per_source = distance_histogram(graph, sources, args.weighted, args.direction,
+                                          args.workers, args.batch_size)
+    print(hist.to_string(index=False))
+    print(f'{len(per_source)} sources in {time.perf_counter() - start:.2f}s, '
+          f'mean reachable {per_source["reachable"].mean():.1f}')
+
+    if args.vetted:
+        vetted = np.loadtxt(args.vetted, dtype=np.int64, ndmin=1)
+    else:
+        in_degree = graph.positive().degree_frame('in')
+        vetted = in_degree.sort_values('degree', ascending=False, kind='stable')['node'][:50].to_numpy()
+
+    nearest = nearest_vetted(graph, vetted, args.weighted, args.direction)
+    print(nearest['distance'].describe().to_string())
+    if args.out:
+        nearest.to_csv(args.out, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import pandas as pd
+import numpy as np
+
+'''
+James Clooney
+MS6021
+Networks and Complex Systems
+
+
+            User Index
+-------------------------------------------
+Edges sorted by (user, TIME) with offset
+arrays for the source and target side, so
+the degree over time of any user is a slice
+of the sorted arrays rather than a scan of
+the whole dataframe.
+'''
+
+
+class EdgeSide:
+
+    def __init__(self, ids, time):
+
+        # Stable sort by user then time, rows with equal times keep file order
+        self.order = np.lexsort((time, ids))
+        sorted_ids = ids[self.order]
+        self.time = time[self.order]
+
+        # Start of every user's block, with the end of the last block appended
+        self.users = np.unique(sorted_ids)
+        self.offsets = np.append(np.searchsorted(sorted_ids, self.users), len(sorted_ids))
+
+    # Start and end positions of the users' blocks, empty for unknown users
+    def bounds(self, users):
+        users = np.asarray(users)
+        if len(self.users) == 0:
+            empty = np.zeros(users.shape, dtype=np.int64)
+            return empty, empty
+
+        pos = np.minimum(np.searchsorted(self.users, users), len(self.users) - 1)
+        found = self.users[pos] == users
+
+        lo = np.where(found, self.offsets[pos], 0)
+        hi = np.where(found, self.offsets[pos + 1], 0)
+        return lo, hi
+
+    def degree(self):
+        return pd.Series(np.diff(self.offsets), index=self.users)
+
+
+class UserIndex:
+
+    def __init__(self, df):
+        time = df['TIME'].to_numpy()
+
+        # Source side gives the ratings a user made, target side the ones received
+        self.source = EdgeSide(df['SOURCE'].to_numpy(), time)
+        self.target = EdgeSide(df['TARGET'].to_numpy(), time)
+
+        # Shared cumulative counts, sliced for every user
+        max_degree = max(np.diff(self.source.offsets).max(initial=0),
+                         np.diff(self.target.offsets).max(initial=0))
+        self.ranks = np.arange(1, max_degree + 1)
+
+    # Times and cumulative degree of one user on one side, views of the index
+    def series(self, user, side='source'):
+        edges = self.source if side == 'source' else self.target
+        lo, hi = edges.bounds([user])
+        lo, hi = int(lo[0]), int(hi[0])
+        return edges.time[lo:hi], self.ranks[:hi - lo]
+
+    # Same values as Distribution.k_vs_t, but as arrays sorted by TIME rather
+    # than Series in frame order. The two agree when the frame is TIME sorted
+    def k_vs_t(self, user):
+        t_in, k_in = self.series(user, 'source')
+        t_out, k_out = self.series(user, 'target')
+        return t_in, t_out, k_in, k_out
+
+    # Tidy frame of user, TIME and cumulative degree for many users at once
+    def series_batch(self, users, side='source'):
+        edges = self.source if side == 'source' else self.target
+        users = np.asarray(users)
+        lo, hi = edges.bounds(users)
+        lengths = hi - lo
+
+        # Positions of every requested block laid end to end
+        starts = np.cumsum(lengths) - lengths
+        pos = np.repeat(lo - starts, lengths) + np.arange(lengths.sum())
+        k = np.arange(lengths.sum()) - np.repeat(starts, lengths) + 1
+
+        return pd.DataFrame({'user': np.repeat(users, lengths),
+                             'TIME': edges.time[pos],
+                             'k': k})